@@ -0,0 +1,22 @@
+# Included by OpenCV right before the library of each module is created (see OPENCV_CMAKE_HOOKS_DIR)
+
+# unity sources are only used for the main modules, contrib ones keep precompiled headers
+string(FIND "${CMAKE_CURRENT_SOURCE_DIR}/" "${OpenCV_SOURCE_DIR}/modules/" main_module)
+if(CONAN_OPENCV_UNITY_BUILD AND main_module EQUAL 0)
+    set(CMAKE_UNITY_BUILD ON)
+    # OpenCV adds its precompiled headers as per-source compile flags, which would keep every source
+    # out of the unity sources
+    set(ENABLE_PRECOMPILED_HEADERS OFF)
+    foreach(source ${OPENCV_MODULE_${the_module}_SOURCES})
+        if(source MATCHES "\\.dispatch\\.cpp$")
+            # dispatch sources include their SIMD implementations under CPU-specific macros
+            set_source_files_properties(${source} PROPERTIES SKIP_UNITY_BUILD_INCLUSION ON)
+        elseif(source MATCHES "\\.cpp$" AND EXISTS "${source}")
+            # cv::sin, cv::cos... overloads for soft floats hijack the unqualified calls of the next sources
+            file(STRINGS "${source}" softfloat REGEX "opencv2/core/softfloat\\.hpp")
+            if(softfloat)
+                set_source_files_properties(${source} PROPERTIES SKIP_UNITY_BUILD_INCLUSION ON)
+            endif()
+        endif()
+    endforeach()
+endif()
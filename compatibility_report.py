@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Lists the opencv binary Conan resolves for each of a set of configurations: the binary of the package ID of
+the configuration, an ABI compatible one (compatible_packages of the recipe), or none, when it would be built.
+
+The configurations file has one configuration per line, a name and the arguments of conan info (-s, -o, -pr...):
+
+    gcc9.3-relwithdebinfo: -s compiler.version=9.3 -s build_type=RelWithDebInfo
+    shared-no-jpeg: -o opencv:shared=True -o opencv:jpeg=False
+
+usage: python compatibility_report.py opencv/4.3.0@conan/stable configurations.txt [--remote name] [--json file]
+"""
+
+import argparse
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+import tempfile
+
+
+def conan_json(command):
+    """runs a conan command with --json, returns its output and its JSON result"""
+    handle, path = tempfile.mkstemp(suffix=".json")
+    os.close(handle)
+    try:
+        process = subprocess.Popen(command + ["--json", path], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   universal_newlines=True)
+        output = process.communicate()[0]
+        if process.returncode != 0:
+            raise RuntimeError("%s failed:\n%s" % (" ".join(command), output))
+        with open(path) as f:
+            return output, json.load(f)
+    finally:
+        os.remove(path)
+
+
+def read_configurations(path):
+    configurations = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            name, _, arguments = line.partition(":")
+            configurations.append((name.strip(), shlex.split(arguments)))
+    return configurations
+
+
+def existing_binaries(reference, remote):
+    """settings of the binaries of reference in the local cache, or in remote"""
+    command = ["conan", "search", reference] + (["-r", remote] if remote else [])
+    try:
+        _, result = conan_json(command)
+    except RuntimeError:
+        # no binary at all
+        return {}
+    binaries = {}
+    for remote_result in result.get("results", []):
+        for item in remote_result.get("items", []):
+            for package in item.get("packages", []):
+                binaries[package["id"]] = package.get("settings", {})
+    return binaries
+
+
+def resolve(reference, arguments, remote):
+    command = ["conan", "info", reference] + arguments + (["-r", remote] if remote else [])
+    output, graph = conan_json(command)
+    name = reference.split("/")[0]
+    node = next(node for node in graph if node["reference"].split("/")[0] == name)
+    # the ID of the configuration only appears in the message of the compatible binary lookup
+    fallback = re.search(r"Main binary package '(\w+)' missing\. Using compatible package '(\w+)'", output)
+    requested = fallback.group(1) if fallback else node["id"]
+    if node["binary"] in ["Missing", "Build"]:
+        status = "missing"
+    elif fallback:
+        status = "compatible"
+    else:
+        status = "exact"
+    return {"requested_id": requested,
+            "package_id": node["id"] if status != "missing" else None,
+            "binary": node["binary"],
+            "status": status}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("reference", help="reference of the opencv recipe, e.g. opencv/4.3.0@conan/stable")
+    parser.add_argument("configurations", help="file of the configurations, one per line")
+    parser.add_argument("--remote", help="remote to look the binaries up in, the local cache otherwise")
+    parser.add_argument("--json", help="writes the report to this file too")
+    args = parser.parse_args()
+
+    binaries = existing_binaries(args.reference, args.remote)
+    report = []
+    for name, arguments in read_configurations(args.configurations):
+        entry = {"configuration": name, "arguments": " ".join(arguments)}
+        entry.update(resolve(args.reference, arguments, args.remote))
+        settings = binaries.get(entry["package_id"], {})
+        entry["build_type"] = settings.get("build_type")
+        entry["compiler_version"] = settings.get("compiler.version")
+        report.append(entry)
+
+    for entry in report:
+        line = "%-32s %-10s %s" % (entry["configuration"], entry["status"], entry["package_id"] or "-")
+        if entry["status"] == "compatible":
+            line += " (%s, compiler.version %s)" % (entry["build_type"], entry["compiler_version"])
+        print(line)
+    counts = dict((status, sum(1 for entry in report if entry["status"] == status))
+                  for status in ["exact", "compatible", "missing"])
+    print("%d exact, %d compatible, %d missing" % (counts["exact"], counts["compatible"], counts["missing"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"reference": args.reference, "remote": args.remote, "summary": counts,
+                       "configurations": report}, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,18 @@
 from conans import ConanFile, CMake, tools
+from conans.model.manifest import FileTreeManifest
 from conans.model.version import Version
-from conans.errors import ConanInvalidConfiguration
+from conans.paths import get_conan_user_home
+from conans.errors import ConanException, ConanInvalidConfiguration
+from contextlib import contextmanager
+from io import StringIO
+import hashlib
+import json
 import os
+import re
+import shutil
+import sys
+import tarfile
+import time
 
 
 class OpenCVConan(ConanFile):
@@ -39,8 +50,25 @@ class OpenCVConan(ConanFile):
                "openblas": [True, False],
                "ffmpeg": [True, False],
                "lapack": [True, False],
-               "parallel": ["tbb", "openmp", None],
-               "quirc": [True, False]}
+               "parallel": ["tbb", "openmp", "pthreads", None],
+               "quirc": [True, False],
+               "cpu_baseline": [None, "native", "SSE2", "SSE3", "SSSE3", "SSE4_1", "SSE4_2",
+                                "AVX", "AVX2", "AVX512_SKX", "NEON"],
+               "cpu_dispatch": "ANY",
+               "modules": "ANY",
+               "ninja": [True, False],
+               "compiler_launcher": [None, "ccache", "sccache"],
+               "unity_build": [True, False],
+               "lto": [None, "full", "thin"],
+               "pgo": [True, False],
+               "instrumentation": [True, False],
+               "perf_tests": [True, False],
+               "world": [True, False],
+               "videoio_plugins": [True, False],
+               "strip": [True, False],
+               "hal": "ANY",
+               "static_companion": [True, False],
+               "openjpeg_threads": [True, False]}
     default_options = {"shared": False,
                        "fPIC": True,
                        "contrib": False,
@@ -67,8 +95,25 @@ class OpenCVConan(ConanFile):
                        "ffmpeg": False,
                        "lapack": False,
                        "parallel": None,
-                       "quirc": True}
-    exports_sources = ["CMakeLists.txt", "patches/*.patch"]
+                       "quirc": True,
+                       "cpu_baseline": None,
+                       "cpu_dispatch": None,
+                       "modules": None,
+                       "ninja": False,
+                       "compiler_launcher": None,
+                       "unity_build": False,
+                       "lto": None,
+                       "pgo": False,
+                       "instrumentation": False,
+                       "perf_tests": False,
+                       "world": False,
+                       "videoio_plugins": False,
+                       "strip": False,
+                       "hal": None,
+                       "static_companion": False,
+                       "openjpeg_threads": False}
+    exports_sources = ["CMakeLists.txt", "cmake-hooks/*.cmake", "patches/*.patch", "pgo/*", "perf/*",
+                       "test_package/*.jpg", "test_package/*.tiff"]
     exports = "LICENSE"
     generators = "cmake"
     description = "OpenCV is an open source computer vision and machine learning software library."
@@ -77,6 +122,29 @@ class OpenCVConan(ConanFile):
     _source_subfolder = "source_subfolder"
     _build_subfolder = "build_subfolder"
     _cmake = None
+    _sources = {"opencv": {"url": "https://github.com/opencv/opencv/archive/{version}.tar.gz",
+                           "sha256": "68bc40cbf47fdb8ee73dfaf0d9c6494cd095cf6294d99de445ab64cf853d278a",
+                           "folder": "opencv"},
+                "contrib": {"url": "https://github.com/opencv/opencv_contrib/archive/{version}.tar.gz",
+                            "sha256": "acb8e89c9e7d1174e63e40532125b60d248b00e517255a98a419d415228c6a55",
+                            "folder": "opencv_contrib"}}
+    _native_cpu_baseline = None
+    _dependency_closures = None
+
+    # x86 baselines ordered from the oldest ISA to the newest one, with the /proc/cpuinfo flags
+    # each of them needs on top of the previous ones
+    _x86_cpu_baselines = [("SSE2", ["sse2"]),
+                          ("SSE3", ["sse3"]),
+                          ("SSSE3", ["ssse3"]),
+                          ("SSE4_1", ["sse4_1"]),
+                          ("SSE4_2", ["sse4_2", "popcnt"]),
+                          ("AVX", ["avx"]),
+                          ("AVX2", ["avx2", "fma", "f16c"]),
+                          ("AVX512_SKX", ["avx512f", "avx512cd", "avx512bw", "avx512dq", "avx512vl"])]
+    _cpu_features = ["SSE", "SSE2", "SSE3", "SSSE3", "SSE4_1", "POPCNT", "SSE4_2", "FP16", "FMA3",
+                     "AVX", "AVX2", "AVX_512F", "AVX512_COMMON", "AVX512_KNL", "AVX512_KNM",
+                     "AVX512_SKX", "AVX512_CNL", "AVX512_CLX", "AVX512_ICL",
+                     "NEON", "VFPV3", "VSX", "VSX3"]
 
     def configure(self):
         compiler_version = Version(self.settings.compiler.version.value)
@@ -91,19 +159,126 @@ class OpenCVConan(ConanFile):
             del self.options.harfbuzz
             del self.options.glog
             del self.options.gflags
+        if self.options.cpu_baseline == "native":
+            if tools.cross_building(self.settings):
+                raise ConanInvalidConfiguration(
+                    "opencv:cpu_baseline=native can't be used when cross-building")
+            if not self._detect_cpu_baseline():
+                raise ConanInvalidConfiguration(
+                    "opencv:cpu_baseline=native couldn't detect the host CPU features, "
+                    "please set an explicit opencv:cpu_baseline")
+        elif self.options.cpu_baseline:
+            is_arm = str(self.settings.arch).startswith(("arm", "aarch"))
+            if is_arm != (self.options.cpu_baseline == "NEON"):
+                raise ConanInvalidConfiguration(
+                    "opencv:cpu_baseline=%s is not available for arch %s" % (self.options.cpu_baseline,
+                                                                           self.settings.arch))
+        for feature in self._cpu_dispatch:
+            if feature not in self._cpu_features:
+                raise ConanInvalidConfiguration(
+                    "opencv:cpu_dispatch: unknown CPU feature '%s', use one of %s" % (feature,
+                                                                                   ", ".join(self._cpu_features)))
+        available_modules = self._available_opencv_modules
+        for module in self._requested_modules:
+            if module not in available_modules:
+                raise ConanInvalidConfiguration(
+                    "opencv:modules: module '%s' is not available with the current options, use some of %s" % (
+                        module, ", ".join(sorted(available_modules))))
+        if self.options.parallel == "pthreads" and self.settings.os == "Windows" and \
+                self.settings.compiler == "Visual Studio":
+            raise ConanInvalidConfiguration("opencv:parallel=pthreads is not available with Visual Studio")
+        if self.options.parallel == "pthreads" and self.settings.os == "Emscripten":
+            raise ConanInvalidConfiguration("opencv:parallel=pthreads is not available with Emscripten")
+        if self.options.parallel == "pthreads" and self.settings.os in ["Macos", "iOS"]:
+            # parallel_for_ always runs on GCD on Apple platforms, the pthreads framework is never used
+            raise ConanInvalidConfiguration("opencv:parallel=pthreads is not available on %s" % self.settings.os)
+        if self.options.lapack and self.options.openblas:
+            raise ConanInvalidConfiguration("opencv:lapack and opencv:openblas are exclusive, "
+                                            "openblas provides LAPACK too")
+        if self.options.lto == "thin" and self.settings.compiler not in ["clang", "apple-clang"]:
+            raise ConanInvalidConfiguration("opencv:lto=thin requires clang")
+        if self.options.pgo:
+            if self.settings.compiler not in ["gcc", "clang", "apple-clang"]:
+                raise ConanInvalidConfiguration("opencv:pgo is only available for gcc and clang")
+            if tools.cross_building(self.settings):
+                raise ConanInvalidConfiguration(
+                    "opencv:pgo can't be used when cross-building, the training runs on the build machine")
+            missing_modules = [module for module in self._pgo_training_modules if module not in self._opencv_modules]
+            if missing_modules:
+                raise ConanInvalidConfiguration(
+                    "opencv:pgo training requires the modules %s" % ", ".join(missing_modules))
+        if self.options.perf_tests:
+            missing_modules = [module for module in self._perf_tests_modules if module not in self._opencv_modules]
+            if missing_modules:
+                raise ConanInvalidConfiguration(
+                    "opencv:perf_tests requires the modules %s" % ", ".join(missing_modules))
+        if self.options.videoio_plugins and not self.options.shared:
+            raise ConanInvalidConfiguration("opencv:videoio_plugins requires opencv:shared=True, "
+                                            "the plugins link the shared OpenCV libraries")
+        if self.options.strip and (str(self.settings.os) not in ["Linux", "Android", "FreeBSD"] or
+                                   self.settings.compiler not in ["gcc", "clang"]):
+            raise ConanInvalidConfiguration("opencv:strip is only available for ELF binaries built with gcc or clang")
+        if self.options.static_companion:
+            # static builds are the package of a shared build with the same options
+            if not self.options.fPIC:
+                raise ConanInvalidConfiguration("opencv:static_companion requires opencv:fPIC=True")
+            if str(self.settings.os) not in ["Linux", "FreeBSD", "Macos"]:
+                # the objects of a DLL are built for dllexport
+                raise ConanInvalidConfiguration("opencv:static_companion is only available for Linux, FreeBSD and "
+                                                "Macos")
+            if self.options.lto or self.options.pgo:
+                # LTO objects only have bytecode, and the static build would train its own profiles
+                raise ConanInvalidConfiguration("opencv:static_companion can't be used with opencv:lto or "
+                                                "opencv:pgo")
+            if self.options.videoio_plugins or self.options.perf_tests:
+                raise ConanInvalidConfiguration("opencv:static_companion can't be used with opencv:videoio_plugins "
+                                                "or opencv:perf_tests, which link the shared libraries")
+        if self.options.openjpeg_threads and self.options.jpeg2000 != "openjpeg":
+            raise ConanInvalidConfiguration("opencv:openjpeg_threads requires opencv:jpeg2000=openjpeg")
 
     def source(self):
-        sha256 = "68bc40cbf47fdb8ee73dfaf0d9c6494cd095cf6294d99de445ab64cf853d278a"
-        tools.get("{}/archive/{}.tar.gz".format(self.homepage, self.version), sha256=sha256)
-        os.rename('opencv-%s' % self.version, self._source_subfolder)
+        # opencv_contrib is only fetched by build(), for the configurations that need it
+        with self._telemetry_stage("source", self._telemetry_source_stages):
+            self._get_sources("opencv", self._source_subfolder,
+                              excludes=[os.path.join('3rdparty', directory) for directory in
+                                        ['libjasper', 'libjpeg-turbo', 'libjpeg', 'libpng', 'libtiff',
+                                         'libwebp', 'openexr', 'protobuf', 'zlib']])
 
-        sha256 = "acb8e89c9e7d1174e63e40532125b60d248b00e517255a98a419d415228c6a55"
-        tools.get("https://github.com/opencv/opencv_contrib/archive/{}.tar.gz".format(self.version), sha256=sha256)
-        os.rename('opencv_contrib-%s' % self.version, 'contrib')
+    @property
+    def _source_cache_folder(self):
+        return tools.get_env("CONAN_OPENCV_SOURCE_CACHE",
+                             os.path.join(get_conan_user_home(), ".conan", "opencv_sources"))
+
+    def _get_sources(self, name, destination, excludes=None):
+        """extracts the tarball of one of the _sources into destination, skipping the excluded
+        folders; tarballs are kept in a local cache named after their sha256"""
+        url = self._sources[name]["url"].format(version=self.version)
+        sha256 = self._sources[name]["sha256"]
+        tarball = os.path.join(self._source_cache_folder, "%s.tar.gz" % sha256)
+        if os.path.isfile(tarball):
+            try:
+                tools.check_sha256(tarball, sha256)
+            except ConanException:
+                self.output.warn("Removing corrupted %s from the source cache" % tarball)
+                os.remove(tarball)
+        if not os.path.isfile(tarball):
+            tools.mkdir(self._source_cache_folder)
+            partial = "%s.%d.part" % (tarball, os.getpid())
+            tools.download(url, partial)
+            tools.check_sha256(partial, sha256)
+            os.replace(partial, tarball)
+        else:
+            self.output.info("Using %s from the source cache" % tarball)
+
+        excludes = [exclude.replace(os.sep, "/") for exclude in excludes or []]
+
+        def included(member):
+            path = member.name.split("/", 1)[1] if "/" in member.name else ""
+            return not any(path == exclude or path.startswith(exclude + "/") for exclude in excludes)
 
-        for directory in ['libjasper', 'libjpeg-turbo', 'libjpeg', 'libpng', 'libtiff',
-                    'libwebp', 'openexr', 'protobuf', 'zlib']:
-            tools.rmdir(os.path.join(self._source_subfolder, '3rdparty', directory))
+        with tarfile.open(tarball) as tar:
+            tar.extractall(members=[member for member in tar.getmembers() if included(member)])
+        os.rename("%s-%s" % (self._sources[name]["folder"], self.version), destination)
 
     def config_options(self):
         if self.settings.os == 'Windows':
@@ -135,55 +310,118 @@ class OpenCVConan(ConanFile):
                 for package in packages:
                     installer.install(package)
 
+    def build_requirements(self):
+        if self.options.ninja:
+            self.build_requires("ninja/1.10.0")
+        if self.options.unity_build:
+            # CMAKE_UNITY_BUILD is available since CMake 3.16
+            self.build_requires("cmake/3.17.3")
+
     def requirements(self):
+        modules = self._opencv_modules
         self.requires.add('zlib/1.2.11')
-        if self.options.jpeg:
-            # NOTE : use the same libjpeg implementation as jasper uses
-            # otherwise, jpeg_create_decompress will fail on version check
-            if self.options.jpegturbo:
-                self.requires.add('libjpeg-turbo/2.0.4')
-            else:
-                self.requires.add('libjpeg/9d')
-        if self.options.tiff:
-            self.requires.add('libtiff/4.0.9')
-        if self.options.webp:
-            self.requires.add('libwebp/1.0.3')
-        if self.options.png:
-            self.requires.add('libpng/1.6.37')
-        if self.options.jpeg2000 == "openjpeg":
-            self.requires.add('openjpeg/2.3.1')
-        if self.options.jpeg2000 == "jasper":
-            self.requires.add('jasper/2.0.14')
-            self.options["jasper"].jpegturbo = self.options.jpegturbo
-        if not tools.cross_building(self.settings) and self.options.openexr:
-            # OpenEXR currently doesn't support cross-building
-            self.requires.add('openexr/2.3.0')
-        if self.options.protobuf:
+        if "imgcodecs" in modules:
+            if self.options.jpeg:
+                # NOTE : use the same libjpeg implementation as jasper uses
+                # otherwise, jpeg_create_decompress will fail on version check
+                if self.options.jpegturbo:
+                    self.requires.add('libjpeg-turbo/2.0.4')
+                else:
+                    self.requires.add('libjpeg/9d')
+            if self.options.tiff:
+                self.requires.add('libtiff/4.0.9')
+            if self.options.webp:
+                self.requires.add('libwebp/1.0.3')
+            if self.options.png:
+                self.requires.add('libpng/1.6.37')
+            if self.options.jpeg2000 == "openjpeg":
+                self.requires.add('openjpeg/2.3.1')
+            if self.options.jpeg2000 == "jasper":
+                self.requires.add('jasper/2.0.14')
+                self.options["jasper"].jpegturbo = self.options.jpegturbo
+            if not tools.cross_building(self.settings) and self.options.openexr:
+                # OpenEXR currently doesn't support cross-building
+                self.requires.add('openexr/2.3.0')
+        if "dnn" in modules:
             # NOTE : version should be the same as used in OpenCV release,
             # otherwise, PROTOBUF_UPDATE_FILES should be set to re-generate files
             self.requires.add('protobuf/3.5.2@bincrafters/stable')
         if self.options.eigen:
             self.requires.add('eigen/3.3.7')
-        if self.options.gstreamer:
-            self.requires.add('gstreamer/1.16.0@bincrafters/stable')
-            self.requires.add('gst-plugins-base/1.16.0@bincrafters/stable')
+        if "videoio" in modules:
+            # only the plugins link them: they must not reach the link flags of the consumers
+            private = bool(self.options.videoio_plugins)
+            if self.options.gstreamer:
+                self.requires.add('gstreamer/1.16.0@bincrafters/stable', private=private)
+                self.requires.add('gst-plugins-base/1.16.0@bincrafters/stable', private=private)
+            if self.options.ffmpeg:
+                self.requires.add('ffmpeg/4.2.1@bincrafters/stable', private=private)
         if self.options.openblas:
             self.requires.add('openblas/0.3.7')
-        if self.options.ffmpeg:
-            self.requires.add('ffmpeg/4.2.1@bincrafters/stable')
+            # OpenCV's LAPACK HAL needs lapacke.h too
+            self.options["openblas"].build_lapack = True
         if self.options.lapack:
             self.requires.add('lapack/3.7.1@conan/stable')
-        if self.options.contrib:
-            if self.options.freetype:
-                self.requires.add('freetype/2.10.1')
-            if self.options.harfbuzz:
-                self.requires.add('harfbuzz/2.4.0@bincrafters/stable')
-            if self.options.glog:
-                self.requires.add('glog/0.4.0')
-            if self.options.gflags:
-                self.requires.add('gflags/2.2.2')
+        if "freetype" in modules:
+            self.requires.add('freetype/2.10.1')
+            self.requires.add('harfbuzz/2.4.0@bincrafters/stable')
+        if "sfm" in modules:
+            self.requires.add('glog/0.4.0')
+            self.requires.add('gflags/2.2.2')
         if self.options.parallel == "tbb":
                 self.requires('tbb/2020.1')
+        if self.options.hal:
+            self.requires(str(self.options.hal))
+
+    @property
+    def _videoio_plugins(self):
+        """videoio backends built as plugins, with their requirements"""
+        if not self.options.videoio_plugins:
+            return {}
+        plugins = {}
+        if self.options.ffmpeg:
+            plugins["ffmpeg"] = ["ffmpeg::ffmpeg"]
+        if self.options.gstreamer:
+            plugins["gstreamer"] = ["gstreamer::gstreamer", "gst-plugins-base::gst-plugins-base"]
+        return plugins
+
+    def _runtime_paths(self, names):
+        """lib and bin paths of requirements and of all their dependencies"""
+        paths = {"lib_paths": [], "bin_paths": []}
+        pending = list(names)
+        visited = set()
+        while pending:
+            dep = pending.pop()
+            if dep in visited:
+                continue
+            visited.add(dep)
+            cpp_info = self.deps_cpp_info[dep]
+            for key in paths:
+                paths[key].extend(path for path in getattr(cpp_info, key) if path not in paths[key])
+            pending.extend(cpp_info.public_deps)
+        return paths
+
+    @property
+    def _hal_name(self):
+        """name of the HAL package of opencv:hal, also the name of its CMake config"""
+        return str(self.options.hal).split("/")[0]
+
+    @property
+    def _hal_config_dir(self):
+        hal = self.deps_cpp_info[self._hal_name]
+        for folder in hal.build_paths + [hal.rootpath]:
+            for config in ["%sConfig.cmake" % self._hal_name, "%s-config.cmake" % self._hal_name]:
+                if os.path.isfile(os.path.join(folder, config)):
+                    return folder.replace("\\", "/")
+        raise ConanException("opencv:hal: %s doesn't provide a %sConfig.cmake setting OpenCV_HAL_LIBRARIES, "
+                             "OpenCV_HAL_HEADERS and OpenCV_HAL_INCLUDE_DIRS" % (self._hal_name, self._hal_name))
+
+    @property
+    def _with_itt(self):
+        # OpenCV only builds its ittnotify copy for these architectures
+        return bool(self.options.instrumentation) and \
+            str(self.settings.os) not in ["iOS", "watchOS", "tvOS"] and \
+            (str(self.settings.arch).startswith(("x86", "arm")) or str(self.settings.arch) in ["ppc64", "ppc64le"])
 
     @property
     def _android_arch(self):
@@ -194,31 +432,179 @@ class OpenCVConan(ConanFile):
     def _use_mingw(self):
         return self.settings.os == "Windows" and self.settings.compiler == "gcc"
 
-    def _gather_libs(self, p):
-        libs = self.deps_cpp_info[p].libs + self.deps_cpp_info[p].system_libs
-        if not getattr(self.options[p],'shared', False):
-            for dep in self.deps_cpp_info[p].public_deps:
-                libs += self._gather_libs(dep)
-        return libs
-
-    def _gather_lib_paths(self, p):
-        lib_paths = self.deps_cpp_info[p].lib_paths
-        if not getattr(self.options[p],'shared', False):
-            for dep in self.deps_cpp_info[p].public_deps:
-                lib_paths += self._gather_lib_paths(dep)
-        return lib_paths
-
-    def _gather_include_paths(self, p):
-        include_paths = self.deps_cpp_info[p].include_paths
-        if not getattr(self.options[p],'shared', False):
-            for dep in self.deps_cpp_info[p].public_deps:
-                include_paths += self._gather_include_paths(dep)
-        return include_paths
-
-    def _configure_cmake(self):
-        if self._cmake:
+    def _detect_cpu_baseline(self):
+        if self._native_cpu_baseline:
+            return self._native_cpu_baseline
+        arch = str(self.settings.arch)
+        flags = set()
+        if tools.os_info.is_linux and os.path.isfile("/proc/cpuinfo"):
+            for line in tools.load("/proc/cpuinfo").splitlines():
+                key, _, value = line.partition(":")
+                if key.strip() in ("flags", "Features"):
+                    flags.update(value.split())
+                    break
+            if "pni" in flags:
+                flags.add("sse3")
+        elif tools.os_info.is_macos:
+            for key in ["machdep.cpu.features", "machdep.cpu.leaf7_features"]:
+                try:
+                    output = StringIO()
+                    self.run("sysctl -n %s" % key, output=output)
+                    flags.update(output.getvalue().lower().replace(".", "_").split())
+                except Exception:
+                    pass
+            if "avx1_0" in flags:
+                flags.add("avx")
+        if arch == "armv8":
+            self._native_cpu_baseline = "NEON"
+        elif arch.startswith("arm"):
+            self._native_cpu_baseline = "NEON" if "neon" in flags else None
+        elif arch in ["x86", "x86_64"]:
+            for baseline, required in self._x86_cpu_baselines:
+                if not flags.issuperset(required):
+                    break
+                self._native_cpu_baseline = baseline
+        return self._native_cpu_baseline
+
+    @property
+    def _cpu_baseline(self):
+        if self.options.cpu_baseline == "native":
+            return self._detect_cpu_baseline()
+        return str(self.options.cpu_baseline) if self.options.cpu_baseline else None
+
+    @property
+    def _cpu_dispatch(self):
+        if not self.options.cpu_dispatch:
+            return []
+        return [feature.strip().upper() for feature in str(self.options.cpu_dispatch).split(",") if feature.strip()]
+
+    def _detect_memory(self):
+        """memory the build can use, in MB (None if unknown)"""
+        memory = None
+        if tools.os_info.is_linux:
+            if os.path.isfile("/proc/meminfo"):
+                for line in tools.load("/proc/meminfo").splitlines():
+                    if line.startswith("MemTotal:"):
+                        memory = int(line.split()[1]) // 1024
+                        break
+            # containers are usually limited by their cgroup (v2 or v1)
+            for limit_file in ["/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"]:
+                if os.path.isfile(limit_file):
+                    limit = tools.load(limit_file).strip()
+                    if limit.isdigit():
+                        limit = int(limit) // (1024 * 1024)
+                        memory = min(memory, limit) if memory else limit
+                    break
+        elif tools.os_info.is_macos:
+            try:
+                output = StringIO()
+                self.run("sysctl -n hw.memsize", output=output)
+                memory = int(output.getvalue().strip()) // (1024 * 1024)
+            except Exception:
+                pass
+        elif tools.os_info.is_windows:
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong),
+                            ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong),
+                            ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong),
+                            ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong),
+                            ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            status = MemoryStatus()
+            status.dwLength = ctypes.sizeof(MemoryStatus)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                memory = status.ullTotalPhys // (1024 * 1024)
+        return memory
+
+    @property
+    def _build_jobs(self):
+        """compile and link jobs fitting in memory: OpenCV translation units (contrib and dnn above all)
+        take up to a couple of GB each, and so do the links of the biggest modules.
+        CONAN_CPU_COUNT still sets the number of compile jobs when defined."""
+        jobs = tools.cpu_count()
+        memory = self._detect_memory()
+        if not memory:
+            return jobs, jobs
+        compile_memory = int(tools.get_env("CONAN_OPENCV_COMPILE_JOB_MEMORY", 2048 if self.options.contrib else 1536))
+        link_memory = int(tools.get_env("CONAN_OPENCV_LINK_JOB_MEMORY", 4096))
+        compile_jobs = jobs if tools.get_env("CONAN_CPU_COUNT") else max(1, min(jobs, memory // compile_memory))
+        link_jobs = max(1, min(compile_jobs, memory // link_memory))
+        return compile_jobs, link_jobs
+
+    def _dependency_closure(self, name):
+        """libs, system libs, lib paths and include paths of a requirement and, unless it is shared,
+        of its public dependencies. Every dependency is visited once and the result is ordered so
+        that each library comes before the libraries it depends on."""
+        if self._dependency_closures is None:
+            self._dependency_closures = {}
+        if name not in self._dependency_closures:
+            ordered = []
+            visited = set()
+
+            def visit(dep):
+                if dep in visited:
+                    return
+                visited.add(dep)
+                if not getattr(self.options[dep], 'shared', False):
+                    for public_dep in self.deps_cpp_info[dep].public_deps:
+                        visit(public_dep)
+                ordered.append(dep)
+
+            visit(name)
+            closure = {"libs": [], "system_libs": [], "lib_paths": [], "include_paths": []}
+            for dep in reversed(ordered):
+                cpp_info = self.deps_cpp_info[dep]
+                for key, values in [("libs", cpp_info.libs),
+                                    ("system_libs", cpp_info.system_libs),
+                                    ("lib_paths", cpp_info.lib_paths),
+                                    ("include_paths", cpp_info.include_paths)]:
+                    closure[key].extend(value for value in values if value not in closure[key])
+            self._dependency_closures[name] = closure
+        return self._dependency_closures[name]
+
+    def _link_libraries(self, name):
+        closure = self._dependency_closure(name)
+        return closure["libs"] + closure["system_libs"]
+
+    @property
+    def _cmake_state_file(self):
+        return os.path.join(self.build_folder, self._build_subfolder, "conan_cmake_state.json")
+
+    def _cmake_state(self, cmake):
+        state = {"definitions": {name: str(value) for name, value in cmake.definitions.items()},
+                 "generator": cmake.generator,
+                 "generator_platform": cmake.generator_platform,
+                 "toolset": cmake.toolset,
+                 "build_type": cmake.build_type}
+        state["hash"] = hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+        return state
+
+    def _restore_cmake_state(self, cmake):
+        """points cmake to the tree configured by build() if it was configured with the very same state"""
+        build_dir = os.path.join(self.build_folder, self._build_subfolder)
+        if not os.path.isfile(self._cmake_state_file) or \
+                not os.path.isfile(os.path.join(build_dir, "CMakeCache.txt")):
+            return False
+        saved = json.loads(tools.load(self._cmake_state_file))
+        if saved.get("hash") != self._cmake_state(cmake)["hash"]:
+            self.output.warn("CMake definitions changed since build(), the build tree will be reconfigured")
+            return False
+        cmake.build_folder = build_dir
+        return True
+
+    def _configure_cmake(self, reuse_build_tree=False, pgo_training=False, configure=True):
+        if self._cmake and not pgo_training:
             return self._cmake
-        cmake = CMake(self)
+        cmake = CMake(self, generator="Ninja" if self.options.ninja else None)
+        modules = self._opencv_modules
+        with_imgcodecs = "imgcodecs" in modules
+        with_videoio = "videoio" in modules
 
         # General configuration
         cmake.definitions['OPENCV_CONFIG_INSTALL_PATH'] = "cmake"
@@ -228,6 +614,15 @@ class OpenCVConan(ConanFile):
         cmake.definitions['OPENCV_OTHER_INSTALL_PATH'] = "res"
         cmake.definitions['OPENCV_LICENSES_INSTALL_PATH'] = "licenses"
         cmake.definitions['BUILD_opencv_apps'] = False
+        if self.options.modules:
+            # ts and world are internal modules, not part of _opencv_modules
+            build_list = list(modules)
+            if self.options.perf_tests:
+                build_list.append("ts")
+            if self.options.world:
+                build_list.append("world")
+            cmake.definitions['BUILD_LIST'] = ','.join(build_list)
+        cmake.definitions['BUILD_opencv_world'] = self.options.world
 
         # Compiler configuration
         if self.settings.compiler == 'Visual Studio':
@@ -242,6 +637,72 @@ class OpenCVConan(ConanFile):
         if self.settings.os != 'Windows':
             cmake.definitions['ENABLE_PIC'] = self.options.fPIC
 
+        if self.options.compiler_launcher:
+            launcher = tools.which(str(self.options.compiler_launcher))
+            if not launcher:
+                raise ConanInvalidConfiguration(
+                    "opencv:compiler_launcher=%s but it isn't in the PATH" % self.options.compiler_launcher)
+            languages = ["C", "CXX", "CUDA"] if self.options.cuda else ["C", "CXX"]
+            for language in languages:
+                cmake.definitions['CMAKE_%s_COMPILER_LAUNCHER' % language] = launcher
+            # OpenCV would wrap the compiler with ccache again otherwise
+            cmake.definitions['ENABLE_CCACHE'] = False
+
+        if self.options.unity_build:
+            # unity sources for the OpenCV modules, precompiled headers for the ones opted out in build()
+            cmake.definitions['ENABLE_PRECOMPILED_HEADERS'] = True
+            cmake.definitions['CONAN_OPENCV_UNITY_BUILD'] = True
+            cmake.definitions['OPENCV_CMAKE_HOOKS_DIR'] = os.path.join(self.build_folder, "cmake-hooks")
+
+        # Link time and profile guided optimizations
+        extra_flags = []
+        if self.options.lto == "thin":
+            cmake.definitions['ENABLE_THIN_LTO'] = True
+        elif self.options.lto and self.settings.compiler in ["gcc", "Visual Studio"]:
+            cmake.definitions['ENABLE_LTO'] = True
+        elif self.options.lto:
+            # ENABLE_LTO is only offered for gcc and msvc
+            extra_flags.append("-flto")
+        if self.options.lto and self.settings.compiler == "Visual Studio":
+            cmake.definitions['OPENCV_EXTRA_SHARED_LINKER_FLAGS_RELEASE'] = "/LTCG"
+            cmake.definitions['CMAKE_STATIC_LINKER_FLAGS'] = "/LTCG"
+        elif self.options.lto:
+            # archives of LTO objects are indexed through the compiler plugin
+            for variable, tool in [('CMAKE_AR', "ar"), ('CMAKE_RANLIB', "ranlib")]:
+                program = self._lto_tool(tool)
+                if program:
+                    cmake.definitions[variable] = program
+            if self.settings.compiler == "gcc" and not self.options.shared:
+                # keep regular objects too for the consumers linking without LTO
+                extra_flags.append("-ffat-lto-objects")
+        if self.options.pgo:
+            pgo_flags = self._pgo_flags(pgo_training)
+            extra_flags.extend(pgo_flags)
+            cmake.definitions['OPENCV_EXTRA_EXE_LINKER_FLAGS'] = " ".join(pgo_flags)
+            cmake.definitions['OPENCV_EXTRA_SHARED_LINKER_FLAGS'] = " ".join(pgo_flags)
+        if extra_flags:
+            cmake.definitions['OPENCV_EXTRA_FLAGS'] = " ".join(extra_flags)
+
+        # Binary size: pin OpenCV's function level linking and hidden visibility, package() strips the binaries
+        if self.options.strip:
+            cmake.definitions['ENABLE_PROFILING'] = False
+            cmake.definitions['OPENCV_FORCE_FUNCTIONS_SECTIONS'] = True
+            cmake.definitions['OPENCV_SKIP_GC_SECTIONS'] = False
+            cmake.definitions['OPENCV_SKIP_VISIBILITY_HIDDEN'] = False
+
+        if self.options.ninja:
+            # heavy links (dnn, contrib modules) get their own, smaller, pool
+            compile_jobs, link_jobs = self._build_jobs
+            cmake.definitions['CONAN_OPENCV_JOB_POOLS'] = "compile=%d;link=%d" % (compile_jobs, link_jobs)
+            cmake.definitions['CMAKE_JOB_POOL_COMPILE'] = "compile"
+            cmake.definitions['CMAKE_JOB_POOL_LINK'] = "link"
+
+        # CPU optimizations: baseline is always compiled in, dispatch is selected at runtime
+        if self._cpu_baseline:
+            cmake.definitions['CPU_BASELINE'] = self._cpu_baseline
+        if self._cpu_dispatch:
+            cmake.definitions['CPU_DISPATCH'] = ';'.join(self._cpu_dispatch)
+
         # Disable modules and options that are not compatible with Emscripten
         if self.settings.os == 'Emscripten':
             cmake.definitions['BUILD_opencv_videoio'] = False
@@ -265,11 +726,13 @@ class OpenCVConan(ConanFile):
         cmake.definitions['BUILD_opencv_python_bindings_generator'] = False
         cmake.definitions['BUILD_opencv_python_tests'] = False
 
-        # Don't build tests
+        # Don't build tests, but the perf tests of opencv:perf_tests
         cmake.definitions['BUILD_TESTS'] = False
-        cmake.definitions['BUILD_PERF_TESTS'] = False
-        cmake.definitions['BUILD_opencv_ts'] = False
-        cmake.definitions['INSTALL_TESTS'] = False
+        cmake.definitions['BUILD_PERF_TESTS'] = self.options.perf_tests
+        cmake.definitions['BUILD_opencv_ts'] = self.options.perf_tests
+        cmake.definitions['INSTALL_TESTS'] = self.options.perf_tests
+        if self.options.perf_tests:
+            cmake.definitions['OPENCV_TEST_INSTALL_PATH'] = "bin"
 
         # Don't install docs and examples
         cmake.definitions['BUILD_DOCS'] = False
@@ -288,12 +751,17 @@ class OpenCVConan(ConanFile):
         # NVidia Carotene
         cmake.definitions['WITH_CAROTENE'] = self.options.carotene
 
+        # Custom HAL: OpenCV finds it with find_package(<name> NO_MODULE) and ignores it silently if it fails
+        if self.options.hal:
+            cmake.definitions['OpenCV_HAL'] = self._hal_name
+            cmake.definitions['%s_DIR' % self._hal_name] = self._hal_config_dir
+
         # Eigen
         cmake.definitions['WITH_EIGEN'] = self.options.eigen
 
         # FFMPEG
-        cmake.definitions['WITH_FFMPEG'] = self.options.ffmpeg
-        if self.options.ffmpeg:
+        cmake.definitions['WITH_FFMPEG'] = with_videoio and bool(self.options.ffmpeg)
+        if with_videoio and self.options.ffmpeg:
             cmake.definitions['HAVE_FFMPEG'] = True
             cmake.definitions['HAVE_FFMPEG_WRAPPER'] = False
             cmake.definitions['OPENCV_FFMPEG_SKIP_BUILD_CHECK'] = True
@@ -302,77 +770,95 @@ class OpenCVConan(ConanFile):
             cmake.definitions['OPENCV_INSTALL_FFMPEG_DOWNLOAD_SCRIPT'] = False
             for lib in ['avcodec', 'avformat', 'avutil', 'swscale', 'avresample']:
                 cmake.definitions['FFMPEG_lib%s_VERSION' % lib] = self.deps_cpp_info['ffmpeg'].version
-            cmake.definitions['FFMPEG_LIBRARIES'] = ';'.join(self._gather_libs('ffmpeg'))
-            cmake.definitions['FFMPEG_INCLUDE_DIRS'] = ';'.join(self._gather_include_paths('ffmpeg'))
+            cmake.definitions['FFMPEG_LIBRARIES'] = ';'.join(self._link_libraries('ffmpeg'))
+            cmake.definitions['FFMPEG_INCLUDE_DIRS'] = ';'.join(self._dependency_closure('ffmpeg')['include_paths'])
 
         # GStreamer
-        cmake.definitions['WITH_GSTREAMER'] = self.options.gstreamer
-        if self.options.gstreamer:
+        cmake.definitions['WITH_GSTREAMER'] = with_videoio and bool(self.options.gstreamer)
+        if with_videoio and self.options.gstreamer:
             cmake.definitions['HAVE_GSTREAMER'] = True
             cmake.definitions['GSTREAMER_VERSION'] = self.deps_cpp_info['gstreamer'].version
-            cmake.definitions['GSTREAMER_LIBRARIES'] = ';'.join(self._gather_libs('gstreamer'))
-            cmake.definitions['GSTREAMER_INCLUDE_DIRS'] = ';'.join(self._gather_include_paths('gstreamer'))
+            cmake.definitions['GSTREAMER_LIBRARIES'] = ';'.join(self._link_libraries('gstreamer'))
+            cmake.definitions['GSTREAMER_INCLUDE_DIRS'] = ';'.join(self._dependency_closure('gstreamer')['include_paths'])
+
+        # G-API: the streaming executor (compileStreaming) is part of the module, it only needs ADE, which
+        # OpenCV downloads at configure time; keep it in the source cache for the other configurations
+        cmake.definitions['WITH_ADE'] = "gapi" in modules
+        if "gapi" in modules:
+            cmake.definitions['OPENCV_DOWNLOAD_PATH'] = os.path.join(self._source_cache_folder, "downloads")
+        # the render backend would take the freetype2 of the system from pkg-config
+        cmake.definitions['WITH_FREETYPE'] = False
+        cmake.definitions['WITH_PLAIDML'] = False
+
+        # videoio backends loaded at runtime, opencv_videoio doesn't link them
+        if with_videoio and self._videoio_plugins:
+            cmake.definitions['VIDEOIO_PLUGIN_LIST'] = ','.join(sorted(self._videoio_plugins))
 
         # Intel IPP
         cmake.definitions['BUILD_IPP_IW'] = False
         cmake.definitions['BUILD_WITH_DYNAMIC_IPP'] = False
         cmake.definitions['WITH_IPP'] = False
 
-        # Intel ITT
-        cmake.definitions['BUILD_ITT'] = False
-        cmake.definitions['WITH_ITT'] = False
+        # OpenCV trace and Intel ITT
+        if self.options.instrumentation:
+            cmake.definitions['CV_TRACE'] = True
+            cmake.definitions['ENABLE_INSTRUMENTATION'] = True
+        cmake.definitions['BUILD_ITT'] = self._with_itt
+        cmake.definitions['WITH_ITT'] = self._with_itt
 
         # jasper
-        if self.options.jpeg2000 == "jasper":
+        if with_imgcodecs and self.options.jpeg2000 == "jasper":
             cmake.definitions['BUILD_JASPER'] = False
             cmake.definitions['WITH_JASPER'] = True
 
         # openjpeg
-        if self.options.jpeg2000 == "openjpeg":
+        if with_imgcodecs and self.options.jpeg2000 == "openjpeg":
             cmake.definitions['OpenJPEG_FOUND'] = True
             cmake.definitions['BUILD_OPENJPEG'] = False
             cmake.definitions['WITH_OPENJPEG'] = True
-            cmake.definitions['OPENJPEG_LIBRARIES'] = ';'.join(self._gather_libs('openjpeg'))
-            cmake.definitions['OPENJPEG_INCLUDE_DIRS'] = ';'.join(self._gather_include_paths('openjpeg'))
+            cmake.definitions['OPENJPEG_LIBRARIES'] = ';'.join(self._link_libraries('openjpeg'))
+            cmake.definitions['OPENJPEG_INCLUDE_DIRS'] = ';'.join(self._dependency_closure('openjpeg')['include_paths'])
             cmake.definitions['OPENJPEG_MAJOR_VERSION'] = 2
             cmake.definitions['OPENJPEG_MINOR_VERSION'] = 3
             cmake.definitions['OPENJPEG_BUILD_VERSION'] = 1
 
         # JPEG
         cmake.definitions['BUILD_JPEG'] = False
-        cmake.definitions['WITH_JPEG'] = self.options.jpeg
+        cmake.definitions['WITH_JPEG'] = with_imgcodecs and bool(self.options.jpeg)
 
         # LAPACK
-        cmake.definitions['WITH_LAPACK'] = self.options.lapack
-        if self.options.lapack:
+        lapack = "openblas" if self.options.openblas else "lapack" if self.options.lapack else None
+        cmake.definitions['WITH_LAPACK'] = lapack is not None
+        if lapack:
+            # LAPACK_LIBRARIES skips OpenCV's own search (MKL, system OpenBLAS, Atlas...)
             cmake.definitions['LAPACK_CBLAS_H'] = 'cblas.h'
-            cmake.definitions['LAPACK_IMPL'] = 'LAPACK/Generic'
-            cmake.definitions['LAPACK_INCLUDE_DIR'] = ';'.join(self._gather_include_paths('lapack'))
+            cmake.definitions['LAPACK_IMPL'] = 'OpenBLAS' if lapack == "openblas" else 'LAPACK/Generic'
+            cmake.definitions['LAPACK_INCLUDE_DIR'] = ';'.join(self._dependency_closure(lapack)['include_paths'])
             cmake.definitions['LAPACK_LAPACKE_H'] = 'lapacke.h'
-            cmake.definitions['LAPACK_LIBRARIES'] = ';'.join(self._gather_libs('lapack'))
-            cmake.definitions['LAPACK_LINK_LIBRARIES'] = ';'.join(self._gather_lib_paths('lapack'))
+            cmake.definitions['LAPACK_LIBRARIES'] = ';'.join(self._link_libraries(lapack))
+            cmake.definitions['LAPACK_LINK_LIBRARIES'] = ';'.join(self._dependency_closure(lapack)['lib_paths'])
 
         # OpenEXR
         cmake.definitions['BUILD_OPENEXR'] = False
         if not tools.cross_building(self.settings):
-            cmake.definitions['WITH_OPENEXR'] = self.options.openexr
-            if self.options.openexr:
+            cmake.definitions['WITH_OPENEXR'] = with_imgcodecs and bool(self.options.openexr)
+            if with_imgcodecs and self.options.openexr:
                 cmake.definitions['OPENEXR_ROOT'] = self.deps_cpp_info['openexr'].rootpath
         else:
             cmake.definitions['WITH_OPENEXR'] = False
 
         # PNG
         cmake.definitions['BUILD_PNG'] = False
-        cmake.definitions['WITH_PNG'] = self.options.png
+        cmake.definitions['WITH_PNG'] = with_imgcodecs and bool(self.options.png)
 
         # Protobuf
         cmake.definitions['BUILD_PROTOBUF'] = False
         cmake.definitions['PROTOBUF_UPDATE_FILES'] = False
-        cmake.definitions['WITH_PROTOBUF'] = self.options.protobuf
-        if self.options.protobuf and self.settings.compiler == 'Visual Studio' and self.options.shared:
+        cmake.definitions['WITH_PROTOBUF'] = "dnn" in modules
+        if "dnn" in modules and self.settings.compiler == 'Visual Studio' and self.options.shared:
             # this relies on CMake's bundled FindProtobuf.cmake
             cmake.definitions['Protobuf_USE_STATIC_LIBS'] = not self.options['protobuf'].shared
-        if self.options.protobuf and self.settings.os == 'Android':
+        if "dnn" in modules and self.settings.os == 'Android':
             # add the log library as dependency of protobuf
             cmake.definitions['CONAN_OPENCV_PROTOBUF_DEPENDENCIES'] = 'log'
 
@@ -385,16 +871,16 @@ class OpenCVConan(ConanFile):
 
         # TIFF
         cmake.definitions['BUILD_TIFF'] = False
-        cmake.definitions['WITH_TIFF'] = self.options.tiff
-        if self.options.tiff:
+        cmake.definitions['WITH_TIFF'] = with_imgcodecs and bool(self.options.tiff)
+        if with_imgcodecs and self.options.tiff:
             cmake.definitions['TIFF_FOUND'] = True
             # TIFF_INCLUDE_DIR is used to parse version from tiff.h
             cmake.definitions['TIFF_INCLUDE_DIR'] = self.deps_cpp_info['libtiff'].include_paths[0]
-            cmake.definitions['TIFF_LIBRARY'] = cmake.definitions['TIFF_LIBRARIES'] = ';'.join(self._gather_libs('libtiff'))
+            cmake.definitions['TIFF_LIBRARY'] = cmake.definitions['TIFF_LIBRARIES'] = ';'.join(self._link_libraries('libtiff'))
 
         # WebP
         cmake.definitions['BUILD_WEBP'] = False
-        cmake.definitions['WITH_WEBP'] = self.options.webp
+        cmake.definitions['WITH_WEBP'] = with_imgcodecs and bool(self.options.webp)
 
         # zlib
         cmake.definitions['BUILD_ZLIB'] = False
@@ -409,6 +895,8 @@ class OpenCVConan(ConanFile):
             cmake.definitions["WITH_TBB"] = True
         elif self.options.parallel == "openmp":
             cmake.definitions["WITH_OPENMP"] = True
+        elif self.options.parallel == "pthreads":
+            cmake.definitions["WITH_PTHREADS_PF"] = True
 
         # opencv-conrib modules
         if self.options.contrib:
@@ -416,20 +904,18 @@ class OpenCVConan(ConanFile):
             cmake.definitions['OPENCV_ENABLE_NONFREE'] = self.options.nonfree
 
             # OpenCV doesn't use find_package for freetype & harfbuzz, so let's specify them
-            if self.options.freetype:
+            if "freetype" in modules:
                 cmake.definitions['FREETYPE_FOUND'] = True
-                cmake.definitions['FREETYPE_INCLUDE_DIRS'] = ';'.join(self._gather_include_paths('freetype'))
-                cmake.definitions['FREETYPE_LIBRARIES'] = ';'.join(self._gather_libs('freetype'))
-            if self.options.harfbuzz:
+                cmake.definitions['FREETYPE_INCLUDE_DIRS'] = ';'.join(self._dependency_closure('freetype')['include_paths'])
+                cmake.definitions['FREETYPE_LIBRARIES'] = ';'.join(self._link_libraries('freetype'))
                 cmake.definitions['HARFBUZZ_FOUND'] = True
-                cmake.definitions['HARFBUZZ_INCLUDE_DIRS'] = ';'.join(self._gather_include_paths('harfbuzz'))
-                cmake.definitions['HARFBUZZ_LIBRARIES'] = ';'.join(self._gather_libs('harfbuzz'))
-            if self.options.gflags:
-                cmake.definitions['GFLAGS_INCLUDE_DIR_HINTS'] = ';'.join(self._gather_include_paths('gflags'))
-                cmake.definitions['GFLAGS_LIBRARY_DIR_HINTS'] = ';'.join(self._gather_lib_paths('gflags'))
-            if self.options.glog:
-                cmake.definitions['GLOG_INCLUDE_DIR_HINTS'] = ';'.join(self._gather_include_paths('glog'))
-                cmake.definitions['GLOG_LIBRARY_DIR_HINTS'] = ';'.join(self._gather_lib_paths('glog'))
+                cmake.definitions['HARFBUZZ_INCLUDE_DIRS'] = ';'.join(self._dependency_closure('harfbuzz')['include_paths'])
+                cmake.definitions['HARFBUZZ_LIBRARIES'] = ';'.join(self._link_libraries('harfbuzz'))
+            if "sfm" in modules:
+                cmake.definitions['GFLAGS_INCLUDE_DIR_HINTS'] = ';'.join(self._dependency_closure('gflags')['include_paths'])
+                cmake.definitions['GFLAGS_LIBRARY_DIR_HINTS'] = ';'.join(self._dependency_closure('gflags')['lib_paths'])
+                cmake.definitions['GLOG_INCLUDE_DIR_HINTS'] = ';'.join(self._dependency_closure('glog')['include_paths'])
+                cmake.definitions['GLOG_LIBRARY_DIR_HINTS'] = ';'.join(self._dependency_closure('glog')['lib_paths'])
 
         # system libraries
         if self.settings.os == 'Linux':
@@ -442,178 +928,847 @@ class OpenCVConan(ConanFile):
         if str(self.settings.os) in ["iOS", "watchOS", "tvOS"]:
             cmake.definitions['IOS'] = True
 
-        cmake.configure(build_folder=self._build_subfolder)
+        if not configure:
+            return cmake
+        if pgo_training:
+            # the instrumented build uses the build folder of the final one: gcc matches the profiles
+            # with the paths of the object files
+            cmake.configure(build_folder=self._build_subfolder)
+            return cmake
+        if not reuse_build_tree or not self._restore_cmake_state(cmake):
+            cmake.configure(build_folder=self._build_subfolder)
+            tools.save(self._cmake_state_file, json.dumps(self._cmake_state(cmake), indent=2, sort_keys=True))
         self._cmake = cmake
         return self._cmake
 
+    def _lto_tool(self, tool):
+        """binutils wrapper loading the LTO plugin of the compiler (gcc-ar, llvm-ar...)"""
+        prefix = {"gcc": "gcc-", "clang": "llvm-"}.get(str(self.settings.compiler))
+        if not prefix:
+            return None
+        major = str(self.settings.compiler.version).split(".")[0]
+        for name in ["%s%s-%s" % (prefix, tool, major), prefix + tool]:
+            program = tools.which(name)
+            if program:
+                return program
+        self.output.warn("%s%s not found, static libraries may not be usable with opencv:lto" % (prefix, tool))
+        return None
+
+    @property
+    def _pgo_profile_folder(self):
+        return os.path.join(self.build_folder, "pgo-profile")
+
+    def _pgo_flags(self, training):
+        if training:
+            flags = ["-fprofile-generate=%s" % self._pgo_profile_folder]
+            if self.settings.compiler == "gcc":
+                # OpenCV runs the training workload from several threads
+                flags.append("-fprofile-update=prefer-atomic")
+            return flags
+        if self.settings.compiler == "gcc":
+            return ["-fprofile-use=%s" % self._pgo_profile_folder, "-fprofile-correction", "-Wno-missing-profile"]
+        return ["-fprofile-use=%s" % os.path.join(self._pgo_profile_folder, "opencv.profdata"),
+                "-Wno-profile-instr-unprofiled"]
+
+    @property
+    def _llvm_profdata(self):
+        if self.settings.compiler == "apple-clang":
+            return "xcrun llvm-profdata"
+        major = str(self.settings.compiler.version).split(".")[0]
+        for name in ["llvm-profdata-%s" % major, "llvm-profdata"]:
+            if tools.which(name):
+                return name
+        raise ConanException("llvm-profdata is required by opencv:pgo")
+
+    def _train_pgo_profile(self):
+        """builds an instrumented OpenCV and runs the training workload with it, the final build
+        then uses the recorded profile"""
+        tools.rmdir(self._pgo_profile_folder)
+        cmake = self._configure_cmake(pgo_training=True)
+        with tools.environment_append(self._build_environment):
+            cmake.build()
+
+        training = CMake(self, generator=cmake.generator)
+        training.definitions['OpenCV_DIR'] = os.path.join(self.build_folder, self._build_subfolder)
+        training.definitions['CMAKE_EXE_LINKER_FLAGS'] = " ".join(self._pgo_flags(training=True))
+        training.configure(source_folder="pgo", build_folder="pgo-training")
+        training.build()
+
+        lib_folder = os.path.join(self.build_folder, self._build_subfolder, "lib")
+        command = [os.path.join(self.build_folder, "pgo-training", "bin", "pgo-training"),
+                   os.path.join(self.build_folder, "test_package"),
+                   os.path.join(self.build_folder, self._source_subfolder, "data", "haarcascades"),
+                   tools.get_env("CONAN_OPENCV_PGO_ITERATIONS", "50")]
+        with tools.environment_append({"LD_LIBRARY_PATH": [lib_folder], "DYLD_LIBRARY_PATH": [lib_folder]}):
+            self.run(" ".join('"%s"' % argument for argument in command), run_environment=True)
+        if self.settings.compiler != "gcc":
+            self.run('%s merge -output="%s" "%s"/*.profraw' % (self._llvm_profdata,
+                                                               os.path.join(self._pgo_profile_folder, "opencv.profdata"),
+                                                               self._pgo_profile_folder))
+
+    @property
+    def _telemetry(self):
+        return bool(tools.get_env("CONAN_OPENCV_BUILD_TELEMETRY", False))
+
+    @property
+    def _telemetry_source_stages(self):
+        return os.path.join(self.source_folder, "opencv_telemetry_source.json")
+
+    @property
+    def _telemetry_build_stages(self):
+        return os.path.join(self.build_folder, "opencv_telemetry_build.json")
+
+    @staticmethod
+    def _resource_usage():
+        times = os.times()
+        # CPU time of the recipe and of the processes it ran (compilers, linkers)
+        usage = {"wall": time.time(), "cpu": times[0] + times[1] + times[2] + times[3], "peak_rss_kb": None}
+        try:
+            import resource
+        except ImportError:  # Windows
+            return usage
+        peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                       resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        usage["peak_rss_kb"] = peak_rss // 1024 if sys.platform == "darwin" else peak_rss  # bytes on macOS
+        return usage
+
+    @contextmanager
+    def _telemetry_stage(self, name, stages_file=None):
+        """records the wall time, CPU time and peak RSS of a stage of the build, with CONAN_OPENCV_BUILD_TELEMETRY"""
+        if not self._telemetry:
+            yield
+            return
+        start = self._resource_usage()
+        yield
+        end = self._resource_usage()
+        stages_file = stages_file or self._telemetry_build_stages
+        stages = json.loads(tools.load(stages_file)) if os.path.isfile(stages_file) else []
+        stages.append({"stage": name,
+                       "wall_s": round(end["wall"] - start["wall"], 3),
+                       "cpu_s": round(end["cpu"] - start["cpu"], 3),
+                       # getrusage only keeps a high-water mark: the largest process since the recipe started
+                       "peak_rss_mb": end["peak_rss_kb"] // 1024 if end["peak_rss_kb"] is not None else None})
+        tools.save(stages_file, json.dumps(stages, indent=2))
+
+    def _ninja_targets(self):
+        """compile and link times per target, from the log of the Ninja build"""
+        ninja_log = os.path.join(self.build_folder, self._build_subfolder, ".ninja_log")
+        if not os.path.isfile(ninja_log):
+            return None
+        outputs = {}
+        for line in tools.load(ninja_log).splitlines():
+            if line.startswith("#"):
+                continue
+            start, end, _, output, _ = line.split("\t")
+            # the last entry of an output is its latest build
+            outputs[output] = (int(end) - int(start)) / 1000.0
+        targets = {}
+        for output, seconds in outputs.items():
+            target = output.split(".dir/")[0].rsplit("/", 1)[-1] if ".dir/" in output else "other"
+            entry = targets.setdefault(target, {"seconds": 0.0, "outputs": 0})
+            entry["seconds"] = round(entry["seconds"] + seconds, 3)
+            entry["outputs"] += 1
+        slowest = sorted(outputs.items(), key=lambda item: item[1], reverse=True)[:20]
+        return {"targets": targets, "slowest_outputs": [{"output": output, "seconds": seconds}
+                                                        for output, seconds in slowest]}
+
+    def _package_telemetry(self):
+        stages = []
+        for stages_file in [self._telemetry_source_stages, self._telemetry_build_stages]:
+            if os.path.isfile(stages_file):
+                stages.extend(json.loads(tools.load(stages_file)))
+        report = {"package_id": self.info.package_id(),
+                  "settings": dict(self.info.settings.as_list()),
+                  "options": dict(self.info.options.as_list()),
+                  "cpu_count": tools.cpu_count(),
+                  "stages": stages,
+                  # per target times need opencv:ninja=True
+                  "ninja": self._ninja_targets()}
+        tools.save(os.path.join(self.package_folder, "telemetry", "build-telemetry.json"),
+                   json.dumps(report, indent=2, sort_keys=True))
+        for stage in stages:
+            self.output.info("%-16s %8.1f s wall %8.1f s CPU" % (stage["stage"], stage["wall_s"], stage["cpu_s"]))
+
+    @property
+    def _build_environment(self):
+        compile_jobs, _ = self._build_jobs
+        env = {"CONAN_CPU_COUNT": str(compile_jobs)}
+        if self.options.compiler_launcher == "ccache":
+            # needed for ccache to cache the units built with precompiled headers
+            env["CCACHE_SLOPPINESS"] = "pch_defines,time_macros"
+        return env
+
+    @property
+    def _static_companion_cache(self):
+        """next to the folders of the recipe in the Conan cache, so that conan remove removes them too"""
+        if self._recipe_revision:
+            default = os.path.join(os.path.dirname(self.recipe_folder), "static_companions")
+        else:
+            default = os.path.join(get_conan_user_home(), ".conan", "opencv_static_companions")
+        return tools.get_env("CONAN_OPENCV_STATIC_COMPANIONS", default)
+
+    @property
+    def _recipe_revision(self):
+        """revision of the recipe in the local cache (hash of its manifest), None out of the cache"""
+        recipe_folder = getattr(self, "recipe_folder", None)
+        if not recipe_folder or not os.path.isfile(os.path.join(recipe_folder, "conanmanifest.txt")):
+            return None
+        return FileTreeManifest.load(recipe_folder).summary_hash
+
+    def _static_companion_key(self):
+        """the recipe revision and the CMake state of the build, but the library type and the folders, which are the
+        only differences between a shared build and the static one"""
+        revision = self._recipe_revision
+        if not revision:
+            return None
+        state = self._cmake_state(self._configure_cmake(configure=False))
+        state["definitions"] = {name: value.replace(self.build_folder, "<build>")
+                                for name, value in state["definitions"].items()
+                                if name not in ["BUILD_SHARED_LIBS", "CMAKE_INSTALL_PREFIX"]}
+        del state["hash"]
+        state["recipe_revision"] = revision
+        return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+    @property
+    def _static_companion(self):
+        """package of this opencv:static_companion=True static configuration stored by the shared build, which must
+        come from the same recipe revision and CMake state: static builds of the option never compile OpenCV, their
+        package ID is only ever used by the archives of the shared objects"""
+        if self.options.shared or not self.options.static_companion:
+            return None
+        folder = os.path.join(self._static_companion_cache, self.info.package_id())
+        companion_file = os.path.join(folder, "companion.json")
+        key = self._static_companion_key()
+        if not key or not os.path.isfile(companion_file) or \
+                json.loads(tools.load(companion_file)).get("key") != key:
+            raise ConanException("opencv:static_companion: no static libraries built from this recipe revision and "
+                                 "CMake state in %s, build this configuration with opencv:shared=True first" % folder)
+        return os.path.join(folder, "package")
+
     def build(self):
-        # https://github.com/opencv/opencv/issues/8010
-        if str(self.settings.compiler) == 'clang' and str(self.settings.compiler.version) == '3.9':
-            tools.replace_in_file(os.path.join(self._source_subfolder, 'modules', 'imgproc', 'CMakeLists.txt'),
-                                  'ocv_define_module(imgproc opencv_core WRAP java python js)',
-                                  'ocv_define_module(imgproc opencv_core WRAP java python js)\n'
-                                  'set_source_files_properties(${CMAKE_CURRENT_LIST_DIR}/src/'
-                                  'imgwarp.cpp PROPERTIES COMPILE_FLAGS "-O0")')
-
-        # using -isystem will make mingw gcc fail to build
-        if self._use_mingw:
-            tools.replace_in_file(os.path.join(self._source_subfolder, 'cmake', 'OpenCVPCHSupport.cmake'),
-                "ocv_is_opencv_directory(__result ${item})", "set(__result TRUE)")
-
-        tools.patch(base_path=self._source_subfolder,
-            patch_file=os.path.join("patches", "0001-fix-FindOpenEXR-typo.patch"))
-        tools.patch(base_path=self._source_subfolder,
-            patch_file=os.path.join("patches", "0002-fix-FindOpenJPEG-doesnt-exist.patch"))
-        tools.patch(base_path=self._source_subfolder,
-            patch_file=os.path.join("patches", "0003-OpenJPEG-fixed-compilation-and-warnings-with-VS.patch"))
-        tools.patch(base_path=self._source_subfolder,
-            patch_file=os.path.join("patches", "0004-add-protobuf-dependencies.patch"))
-
-        cmake = self._configure_cmake()
-        cmake.build()
+        companion = self._static_companion
+        if companion:
+            self.output.info("Using the static libraries built with the shared ones, from %s" % companion)
+            return
+        if os.path.isfile(self._telemetry_build_stages):
+            os.remove(self._telemetry_build_stages)
+        if self.options.contrib and not os.path.isdir('contrib'):
+            with self._telemetry_stage("contrib sources"):
+                self._get_sources("contrib", 'contrib')
+
+        with self._telemetry_stage("patches"):
+            # https://github.com/opencv/opencv/issues/8010
+            if str(self.settings.compiler) == 'clang' and str(self.settings.compiler.version) == '3.9':
+                tools.replace_in_file(os.path.join(self._source_subfolder, 'modules', 'imgproc', 'CMakeLists.txt'),
+                                      'ocv_define_module(imgproc opencv_core WRAP java python js)',
+                                      'ocv_define_module(imgproc opencv_core WRAP java python js)\n'
+                                      'set_source_files_properties(${CMAKE_CURRENT_LIST_DIR}/src/'
+                                      'imgwarp.cpp PROPERTIES COMPILE_FLAGS "-O0")')
+
+            # sources which don't build within unity sources, per module (None opts out the whole module)
+            if self.options.unity_build:
+                unity_build_excluded = {"calib3d": ["compat_ptsetreg.cpp"],
+                                        "dnn": ["ocl4dnn/src/ocl4dnn_conv_spatial.cpp", "torch/THDiskFile.cpp"],
+                                        "features2d": ["agast_score.cpp"],
+                                        "gapi": None,
+                                        "video": ["bgfg_gaussmix2.cpp", "dis_flow.cpp"]}
+                for module, sources in unity_build_excluded.items():
+                    module_cmakelists = os.path.join(self._source_subfolder, 'modules', module, 'CMakeLists.txt')
+                    if sources is None:
+                        excluded = 'set(CONAN_OPENCV_UNITY_BUILD OFF)\n'
+                    else:
+                        excluded = ''.join('set_source_files_properties(${CMAKE_CURRENT_LIST_DIR}/src/%s '
+                                           'PROPERTIES SKIP_UNITY_BUILD_INCLUSION ON)\n' % source
+                                           for source in sources)
+                    tools.save(module_cmakelists, excluded + tools.load(module_cmakelists))
+
+            # using -isystem will make mingw gcc fail to build
+            if self._use_mingw:
+                tools.replace_in_file(os.path.join(self._source_subfolder, 'cmake', 'OpenCVPCHSupport.cmake'),
+                    "ocv_is_opencv_directory(__result ${item})", "set(__result TRUE)")
+
+            tools.patch(base_path=self._source_subfolder,
+                patch_file=os.path.join("patches", "0001-fix-FindOpenEXR-typo.patch"))
+            tools.patch(base_path=self._source_subfolder,
+                patch_file=os.path.join("patches", "0002-fix-FindOpenJPEG-doesnt-exist.patch"))
+            tools.patch(base_path=self._source_subfolder,
+                patch_file=os.path.join("patches", "0003-OpenJPEG-fixed-compilation-and-warnings-with-VS.patch"))
+            tools.patch(base_path=self._source_subfolder,
+                patch_file=os.path.join("patches", "0004-add-protobuf-dependencies.patch"))
+            if self.options.instrumentation:
+                tools.patch(base_path=self._source_subfolder,
+                    patch_file=os.path.join("patches", "0005-core-read-OPENCV_TRACE-lazily.patch"))
+            if self.options.openjpeg_threads:
+                tools.patch(base_path=self._source_subfolder,
+                    patch_file=os.path.join("patches", "0006-imgcodecs-multithreaded-OpenJPEG-decoding.patch"))
+
+        if self.options.pgo:
+            with self._telemetry_stage("pgo training"):
+                self._train_pgo_profile()
+        with self._telemetry_stage("configure"):
+            cmake = self._configure_cmake()
+        with self._telemetry_stage("compile"):
+            with tools.environment_append(self._build_environment):
+                cmake.build()
 
     def package(self):
+        companion = self._static_companion
+        if companion:
+            self.copy("*", src=companion, symlinks=True)
+            return
         self.copy("LICENSE", dst="licenses", src=self._source_subfolder)
-        cmake = self._configure_cmake()
-        cmake.install()
-        cmake.patch_config_paths()
+        with self._telemetry_stage("package"):
+            # package() runs on a new recipe instance: install from the tree configured in build()
+            # instead of running the whole OpenCV configure step again
+            cmake = self._configure_cmake(reuse_build_tree=True)
+            cmake.install()
+            cmake.patch_config_paths()
+            if self.options.perf_tests:
+                self._package_perf_tests()
+        if self.options.strip:
+            with self._telemetry_stage("strip"):
+                self._strip_binaries()
+        if self._videoio_plugins:
+            self._package_videoio_plugin_requirements()
+        if self.options.static_companion:
+            with self._telemetry_stage("static companion"):
+                self._package_static_companion()
+        if self._telemetry:
+            self._package_telemetry()
+
+    def _package_perf_tests(self):
+        """packages the runner of the opencv_perf_* executables and the test data found in OpenCV's sources;
+        the tests needing other opencv_extra data are reported as skipped"""
+        self.copy("run_perf_tests.py", dst="bin", src="perf")
+        for destination, source in self._perf_tests_data.items():
+            self.copy(os.path.basename(source), dst=os.path.join("res", "testdata", os.path.dirname(destination)),
+                      src=os.path.join(self._source_subfolder, os.path.dirname(source)))
 
-    def add_libraries_from_pc(self, library):
-        pkg_config = tools.PkgConfig(library)
-        libs = [lib[2:] for lib in pkg_config.libs_only_l]  # cut -l prefix
-        lib_paths = [lib[2:]
-                     for lib in pkg_config.libs_only_L]  # cut -L prefix
-        self.cpp_info.libs.extend(libs)
-        self.cpp_info.libdirs.extend(lib_paths)
-        self.cpp_info.sharedlinkflags.extend(pkg_config.libs_only_other)
-        self.cpp_info.exelinkflags.extend(pkg_config.libs_only_other)
+    @property
+    def _videoio_plugin_requirements_folder(self):
+        return os.path.join("lib", "videoio_plugins")
+
+    def _package_videoio_plugin_requirements(self):
+        """copies the shared libraries of the requirements of the videoio plugins: they are private, consumers
+        don't get them, but the plugins need them at runtime"""
+        folder = self._videoio_plugin_requirements_folder
+        paths = self._runtime_paths([dep.split("::")[0] for deps in self._videoio_plugins.values() for dep in deps])
+        for path in paths["lib_paths"] + paths["bin_paths"]:
+            for pattern in ["*.so*", "*.dylib", "*.dll"]:
+                self.copy(pattern, dst=folder, src=path, keep_path=False, symlinks=True, excludes="gstreamer-1.0")
+            # the GStreamer elements, loaded by GStreamer itself
+            self.copy("*", dst=os.path.join(folder, "gstreamer-1.0"), src=os.path.join(path, "gstreamer-1.0"),
+                      symlinks=True)
+
+    def _package_static_companion(self):
+        """archives the objects of the shared libraries (built with -fPIC) into static libraries, and stores them with
+        the headers and data of the package as the package of the opencv:shared=False configuration of the option,
+        in the companion cache where its build() finds it"""
+        key = self._static_companion_key()
+        if not key:
+            self.output.warn("opencv:static_companion: the recipe is not in the local cache, no static libraries")
+            return
+        static_info = self.info.clone()
+        static_info.options.shared = False
+        static_info.options.fPIC = True
+        static_info.options.static_companion = True
+        folder = os.path.join(self._static_companion_cache, static_info.package_id())
+        staging = "%s.%d.part" % (folder, os.getpid())
+        tools.rmdir(staging)
+        package = os.path.join(staging, "package")
+
+        build_dir = os.path.join(self.build_folder, self._build_subfolder)
+        cmake_cache = tools.load(os.path.join(build_dir, "CMakeCache.txt"))
+
+        def cmake_cache_entry(name, default):
+            match = re.search(r"^%s:\w+=(.+)$" % name, cmake_cache, re.MULTILINE)
+            return match.group(1) if match else default
+
+        ar = cmake_cache_entry("CMAKE_AR", "ar")
+        ranlib = cmake_cache_entry("CMAKE_RANLIB", "ranlib")
+        # CMakeFiles/<target>.dir folders
+        object_folders = {}
+        for root, folders, _ in os.walk(build_dir):
+            if os.path.basename(root) == "CMakeFiles":
+                object_folders.update((name[:-len(".dir")], os.path.join(root, name))
+                                      for name in folders if name.endswith(".dir"))
+
+        # OpenCV's CMake config describes the shared libraries, and the debug info is theirs: the package ID of the
+        # companion isn't the one of regular static builds, its consumers use the Conan generators
+        excluded_folders = ["cmake", os.path.join("lib", "cmake"), "debug", "telemetry"]
+        shared_library = re.compile(r"^lib(.+?)\.(so(\.[0-9.]+)?|([0-9.]+\.)?dylib)$")
+        libraries = []
+        for root, folders, files in os.walk(self.package_folder):
+            folders[:] = [name for name in folders
+                          if os.path.relpath(os.path.join(root, name), self.package_folder) not in excluded_folders]
+            for name in files:
+                path = os.path.join(root, name)
+                match = shared_library.match(name)
+                if match:
+                    if not os.path.islink(path):
+                        libraries.append(match.group(1))
+                    continue
+                destination = os.path.join(package, os.path.relpath(path, self.package_folder))
+                tools.mkdir(os.path.dirname(destination))
+                shutil.copy2(path, destination)
+
+        lib_folder = os.path.join(package, "lib")
+        tools.mkdir(lib_folder)
+        for library in libraries:
+            if library not in object_folders:
+                raise ConanException("opencv:static_companion: no object files found for %s" % library)
+            objects = sorted(os.path.relpath(os.path.join(root, name), object_folders[library])
+                             for root, _, files in os.walk(object_folders[library])
+                             for name in files if name.endswith((".o", ".obj")))
+            archive = os.path.join(lib_folder, "lib%s.a" % library)
+            for start in range(0, len(objects), 100):
+                arguments = " ".join('"%s"' % path for path in objects[start:start + 100])
+                self.run('"%s" qc "%s" %s' % (ar, archive, arguments), cwd=object_folders[library])
+            self.run('"%s" "%s"' % (ranlib, archive))
+        # 3rdparty libraries linked into the shared ones, which package_info() links in static builds, installed
+        # where static builds install them
+        modules = self._opencv_modules
+        third_party = [name for name, linked in [("ade", "gapi" in modules),
+                                                 ("quirc", self.options.quirc and "objdetect" in modules),
+                                                 ("ittnotify", self._with_itt)] if linked]
+        third_party_folder = os.path.join(lib_folder, "opencv4", "3rdparty")
+        tools.mkdir(third_party_folder)
+        for name in third_party:
+            archives = [os.path.join(build_dir, folder_name, "lib%s.a" % name)
+                        for folder_name in ["lib", os.path.join("3rdparty", "lib")]]
+            archives = [archive for archive in archives if os.path.isfile(archive)]
+            if not archives:
+                raise ConanException("opencv:static_companion: lib%s.a not found in %s" % (name, build_dir))
+            shutil.copy2(archives[0], third_party_folder)
+        if self.options.strip:
+            objcopy = tools.get_env("OBJCOPY", "objcopy")
+            for root, _, files in os.walk(lib_folder):
+                for name in files:
+                    if name.endswith(".a"):
+                        self.run('%s --strip-debug "%s"' % (objcopy, os.path.join(root, name)))
+
+        tools.save(os.path.join(staging, "companion.json"),
+                   json.dumps({"recipe_revision": self._recipe_revision, "key": key}, indent=2))
+        tools.rmdir(folder)
+        os.rename(staging, folder)
+        self.output.info("Static libraries of package ID %s stored in %s" % (static_info.package_id(), folder))
+
+    def _elf_binaries(self):
+        """shared libraries, plugins, executables and static archives of the package"""
+        binaries = []
+        for folder in ["lib", "bin"]:
+            for root, _, files in os.walk(os.path.join(self.package_folder, folder)):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if os.path.islink(path):
+                        continue
+                    with open(path, "rb") as f:
+                        magic = f.read(8)
+                    if magic[:4] == b"\x7fELF" or magic == b"!<arch>\n":
+                        binaries.append(path)
+        return binaries
+
+    def _build_id(self, binary):
+        output = StringIO()
+        self.run('%s -n "%s"' % (tools.get_env("READELF", "readelf"), binary), output=output)
+        for line in output.getvalue().splitlines():
+            if "Build ID:" in line:
+                return line.split("Build ID:")[1].strip()
+        return None
+
+    def _strip_binaries(self):
+        """moves the debug info of the packaged binaries to debug/, where gdb finds it by build-id
+        (set debug-file-directory), and strips them; the gnu-debuglink records its name and CRC"""
+        objcopy = tools.get_env("OBJCOPY", "objcopy")
+        if not tools.which(objcopy):
+            raise ConanException("opencv:strip requires objcopy (binutils), set OBJCOPY to use another one")
+        debug_folder = os.path.join(self.package_folder, "debug")
+        report = {"binaries": {}, "size_before": 0, "size_after": 0, "debug_size": 0}
+        for binary in self._elf_binaries():
+            relative_path = os.path.relpath(binary, self.package_folder).replace(os.sep, "/")
+            size_before = os.path.getsize(binary)
+            with open(binary, "rb") as f:
+                archive = f.read(8) == b"!<arch>\n"
+            if archive:
+                if self.options.lto:
+                    # objcopy can't rewrite archives of LTO objects without the compiler plugin
+                    continue
+                # debug info of static code ends up in the consumers' binaries, which split it themselves
+                self.run('%s --strip-debug "%s"' % (objcopy, binary))
+                debug_size = 0
+            else:
+                build_id = self._build_id(binary)
+                if build_id:
+                    debug_file = os.path.join(debug_folder, ".build-id", build_id[:2], build_id[2:] + ".debug")
+                else:
+                    debug_file = os.path.join(debug_folder, relative_path + ".debug")
+                if not os.path.isdir(os.path.dirname(debug_file)):
+                    os.makedirs(os.path.dirname(debug_file))
+                self.run('%s --only-keep-debug "%s" "%s"' % (objcopy, binary, debug_file))
+                self.run('%s --strip-unneeded --add-gnu-debuglink="%s" "%s"' % (objcopy, debug_file, binary))
+                debug_size = os.path.getsize(debug_file)
+            size_after = os.path.getsize(binary)
+            report["binaries"][relative_path] = {"size_before": size_before, "size_after": size_after,
+                                                 "debug_size": debug_size}
+            report["size_before"] += size_before
+            report["size_after"] += size_after
+            report["debug_size"] += debug_size
+        tools.save(os.path.join(debug_folder, "size-report.json"), json.dumps(report, indent=2, sort_keys=True))
+        self.output.info("Stripped binaries: %.1f MB -> %.1f MB, %.1f MB of debug info in %s" % (
+            report["size_before"] / 1048576.0, report["size_after"] / 1048576.0, report["debug_size"] / 1048576.0,
+            debug_folder))
+
+    def package_id(self):
+        del self.info.options.ninja
+        del self.info.options.compiler_launcher
+        del self.info.options.unity_build
+        if self.options.shared:
+            # the static libraries are stored out of the package, static builds of the option are these static
+            # libraries and have their own package ID
+            del self.info.options.static_companion
+        # a "native" binary is only reusable on hosts supporting the very same baseline
+        if self.options.cpu_baseline == "native":
+            self.info.options.cpu_baseline = self._cpu_baseline
+        if self.options.cpu_dispatch:
+            self.info.options.cpu_dispatch = ",".join(sorted(self._cpu_dispatch))
+        # OpenCV builds its pthreads framework by default wherever opencv:parallel=pthreads is allowed, so both
+        # values share their binaries instead of pinning pthreads
+        if self.options.parallel == "pthreads":
+            self.info.options.parallel = None
+
+        # options which don't change the binary of this configuration
+        modules = self._opencv_modules
+        if self.options.modules:
+            # "imgproc", "core,imgproc" and "opencv_imgproc" build the same modules
+            self.info.options.modules = ",".join(sorted(modules))
+        if "imgcodecs" not in modules:
+            for option in ["jpeg", "jpegturbo", "tiff", "webp", "png", "jpeg2000", "openjpeg_threads", "openexr"]:
+                delattr(self.info.options, option)
+        elif not self.options.jpeg and self.options.jpeg2000 != "jasper":
+            # jpegturbo also selects the libjpeg of jasper
+            del self.info.options.jpegturbo
+        if "videoio" not in modules:
+            for option in ["ffmpeg", "gstreamer", "dc1394", "videoio_plugins"]:
+                delattr(self.info.options, option)
+        elif not self._videoio_plugins:
+            del self.info.options.videoio_plugins
+        if "highgui" not in modules:
+            del self.info.options.gtk
+        if "objdetect" not in modules:
+            del self.info.options.quirc
+        if "dnn" not in modules:
+            del self.info.options.protobuf
+        if not self.options.contrib:
+            del self.info.options.nonfree
+        if not str(self.settings.arch).startswith(("arm", "aarch")):
+            # carotene is an ARM NEON library
+            del self.info.options.carotene
+
+        # ABI compatible binaries, looked up in this order when there is no binary for this package ID
+        for build_type, compiler_version in self._compatible_settings:
+            compatible = self.info.clone()
+            compatible.settings.build_type = build_type
+            compatible.settings.compiler.version = compiler_version
+            self.compatible_packages.append(compatible)
 
-    def package_info(self):
-        opencv_libs = ["stitching",
-                       "photo",
-                       "video",
-                       "ml",
-                       "calib3d",
-                       "features2d",
-                       "highgui",
-                       "videoio",
-                       "flann",
-                       "imgcodecs",
-                       "objdetect",
-                       "dnn",
-                       "imgproc",
-                       "core"]
+    @property
+    def _compatible_settings(self):
+        """(build_type, compiler.version) of the binaries this configuration can use, closest first"""
+        build_types = [str(self.settings.build_type)]
+        # same runtime and ABI, only the optimization level and the debug info differ
+        if build_types[0] in ["Release", "RelWithDebInfo"]:
+            build_types.append("RelWithDebInfo" if build_types[0] == "Release" else "Release")
+        compiler_version = str(self.settings.compiler.version)
+        compiler_versions = [compiler_version]
+        if self.settings.compiler == "gcc" and Version(compiler_version) >= "5":
+            # the ABI of gcc is stable within a major version, but a newer minor version may need symbols
+            # of its libstdc++ which the older ones don't have
+            major = compiler_version.split(".")[0]
+            compiler_versions.extend(sorted((version for version in self.settings.compiler.version.values_range
+                                             if version.split(".")[0] == major and
+                                             Version(version) < compiler_version),
+                                            key=Version, reverse=True))
+        return [(build_type, version) for version in compiler_versions for build_type in build_types][1:]
+
+    _pgo_training_modules = ["imgcodecs", "imgproc", "objdetect"]
+
+    # modules which OpenCV keeps out of opencv_world (OPENCV_MODULE_IS_PART_OF_WORLD)
+    _world_excluded_modules = ["img_hash", "sfm"]
+
+    # the ts module the perf tests are built on requires them
+    _perf_tests_modules = ["imgcodecs", "videoio", "highgui"]
+
+    # perf tests data (relative to OPENCV_TEST_DATA_PATH): its copy in OpenCV's sources
+    _perf_tests_data = {
+        "cv/shared/pic5.png": "samples/data/pic5.png",
+        "cv/cascadeandhog/cascades/haarcascade_frontalface_alt.xml": "data/haarcascades/haarcascade_frontalface_alt.xml",
+        "cv/cascadeandhog/cascades/haarcascade_frontalface_alt2.xml": "data/haarcascades/haarcascade_frontalface_alt2.xml",
+        "cv/cascadeandhog/cascades/lbpcascade_frontalface.xml": "data/lbpcascades/lbpcascade_frontalface.xml",
+    }
 
-        if not self.options.protobuf:
-            opencv_libs.remove("dnn")
+    @property
+    def _available_opencv_modules(self):
+        # module: (required OpenCV modules, OPTIONAL OpenCV modules, conan requirements)
+        core_deps = ["zlib::zlib"]
+        if self.options.eigen:
+            core_deps.append("eigen::eigen")
+        if self.options.parallel == "tbb":
+            core_deps.append("tbb::tbb")
+        if self.options.openblas:
+            core_deps.append("openblas::openblas")
+        if self.options.lapack:
+            core_deps.append("lapack::lapack")
 
+        imgcodecs_deps = ["zlib::zlib"]
+        if self.options.jpeg:
+            imgcodecs_deps.append("libjpeg-turbo::libjpeg-turbo" if self.options.jpegturbo else "libjpeg::libjpeg")
+        if self.options.tiff:
+            imgcodecs_deps.append("libtiff::libtiff")
+        if self.options.webp:
+            imgcodecs_deps.append("libwebp::libwebp")
+        if self.options.png:
+            imgcodecs_deps.append("libpng::libpng")
+        if self.options.jpeg2000:
+            imgcodecs_deps.append("%s::%s" % (self.options.jpeg2000, self.options.jpeg2000))
+        if self.options.get_safe("openexr"):
+            imgcodecs_deps.append("openexr::openexr")
+
+        videoio_deps = []
+        if self.options.ffmpeg and "ffmpeg" not in self._videoio_plugins:
+            videoio_deps.append("ffmpeg::ffmpeg")
+        if self.options.gstreamer and "gstreamer" not in self._videoio_plugins:
+            videoio_deps.extend(["gstreamer::gstreamer", "gst-plugins-base::gst-plugins-base"])
+
+        modules = {
+            "core": ([], ["cudev"], core_deps),
+            "flann": (["core"], [], []),
+            "imgproc": (["core"], [], []),
+            "ml": (["core"], [], []),
+            "photo": (["imgproc"], ["cudaarithm", "cudaimgproc"], []),
+            "dnn": (["core", "imgproc"], [], ["protobuf::protobuf"]),
+            "features2d": (["imgproc"], ["flann"], []),
+            "imgcodecs": (["imgproc"], [], imgcodecs_deps),
+            "videoio": (["imgproc", "imgcodecs"], [], videoio_deps),
+            "calib3d": (["imgproc", "features2d", "flann"], [], []),
+            "highgui": (["imgproc", "imgcodecs"], ["videoio"], []),
+            "objdetect": (["core", "imgproc", "calib3d"], [], []),
+            "stitching": (["imgproc", "features2d", "calib3d", "flann"],
+                          ["xfeatures2d", "cudaarithm", "cudawarping", "cudafeatures2d", "cudalegacy",
+                           "cudaimgproc"], []),
+            "video": (["imgproc"], ["calib3d"], []),
+            "gapi": (["imgproc"], ["video"], []),
+        }
+        if not self.options.protobuf:
+            del modules["dnn"]
         if self.settings.os == 'Emscripten':
-            opencv_libs.remove("videoio")
-
-        if self.settings.os != 'Android':
+            del modules["videoio"]
+        if self.settings.os == 'Android':
             # gapi depends on ade but ade disabled for Android
             # https://github.com/opencv/opencv/blob/4.0.1/modules/gapi/cmake/DownloadADE.cmake#L2
-            opencv_libs.append("gapi")
+            del modules["gapi"]
 
         if self.options.contrib:
-            opencv_libs = [
-                "aruco",
-                "bgsegm",
-                "bioinspired",
-                "ccalib",
-                "datasets",
-                "dpm",
-                "face",
-                "freetype",
-                "fuzzy",
-                "hfs",
-                "img_hash",
-                "line_descriptor",
-                "optflow",
-                "phase_unwrapping",
-                "plot",
-                "reg",
-                "rgbd",
-                "saliency",
-                "shape",
-                "stereo",
-                "structured_light",
-                "superres",
-                "surface_matching",
-                "tracking",
-                "videostab",
-                "xfeatures2d",
-                "ximgproc",
-                "xobjdetect",
-                "xphoto",
-                "sfm"] + opencv_libs
-
+            modules.update({
+                "aruco": (["core", "imgproc", "calib3d"], [], []),
+                "bgsegm": (["core", "imgproc", "video", "calib3d"], [], []),
+                "bioinspired": (["core"], ["highgui"], []),
+                "ccalib": (["core", "imgproc", "calib3d", "features2d", "highgui"], [], []),
+                "datasets": (["core", "imgcodecs", "ml", "flann"], [], []),
+                "dpm": (["core", "imgproc", "objdetect"], ["highgui"], []),
+                "face": (["core", "imgproc", "objdetect", "calib3d", "photo"], [], []),
+                "freetype": (["core", "imgproc"], [], ["freetype::freetype", "harfbuzz::harfbuzz"]),
+                "fuzzy": (["imgproc", "core"], [], []),
+                "hfs": (["core", "imgproc"], [], []),
+                "img_hash": (["imgproc", "core"], [], []),
+                "line_descriptor": (["imgproc"], ["features2d"], []),
+                "optflow": (["core", "imgproc", "calib3d", "video", "ximgproc", "imgcodecs", "flann"], [], []),
+                "phase_unwrapping": (["core", "imgproc"], [], []),
+                "plot": (["core", "imgproc"], [], []),
+                "reg": (["imgproc", "core"], [], []),
+                "rgbd": (["core", "calib3d", "imgproc"], [], []),
+                "saliency": (["imgproc", "features2d"], [], []),
+                "shape": (["core", "imgproc", "calib3d"], [], []),
+                "stereo": (["imgproc", "features2d", "core", "tracking"], [], []),
+                "structured_light": (["core", "imgproc", "calib3d", "phase_unwrapping"], [], []),
+                "superres": (["imgproc", "video", "optflow"],
+                             ["videoio", "cudaarithm", "cudafilters", "cudawarping", "cudaimgproc",
+                              "cudaoptflow", "cudacodec"], []),
+                "surface_matching": (["core", "flann"], [], []),
+                "tracking": (["imgproc", "core", "video", "plot"], ["dnn", "datasets"], []),
+                "videostab": (["imgproc", "features2d", "video", "photo", "calib3d"],
+                              ["cudawarping", "cudaoptflow", "videoio"], []),
+                "xfeatures2d": (["core", "imgproc", "features2d", "calib3d"], ["shape", "ml", "cudaarithm"], []),
+                "ximgproc": (["core", "imgproc", "calib3d", "imgcodecs", "video"], [], []),
+                "xobjdetect": (["core", "imgproc", "objdetect", "imgcodecs"], [], []),
+                "xphoto": (["core", "imgproc", "photo"], [], []),
+                "sfm": (["core", "calib3d", "features2d", "xfeatures2d", "imgcodecs"], [],
+                        ["eigen::eigen", "glog::glog", "gflags::gflags"]),
+            })
             if not self.options.freetype or not self.options.harfbuzz:
-                opencv_libs.remove("freetype")
+                del modules["freetype"]
             if not self.options.eigen or not self.options.glog or not self.options.gflags:
-                opencv_libs.remove("sfm")
+                del modules["sfm"]
             if str(self.settings.os) in ["iOS", "watchOS", "tvOS"]:
-                opencv_libs.remove("superres")
+                del modules["superres"]
 
         if self.options.cuda:
-            opencv_libs = ["cudaarithm",
-                            "cudabgsegm",
-                            "cudacodec",
-                            "cudafeatures2d",
-                            "cudafilters",
-                            "cudaimgproc",
-                            "cudalegacy",
-                            "cudaobjdetect",
-                            "cudaoptflow",
-                            "cudastereo",
-                            "cudawarping",
-                            "cudev"
-                            ] + opencv_libs
+            modules.update({
+                "cudaarithm": (["core", "cudev"], [], []),
+                "cudabgsegm": (["video", "cudev"], [], []),
+                "cudacodec": (["core", "videoio", "cudev"], [], []),
+                "cudafeatures2d": (["features2d", "cudafilters", "cudawarping", "cudev"], [], []),
+                "cudafilters": (["imgproc", "cudaarithm", "cudev"], [], []),
+                "cudaimgproc": (["imgproc", "cudev"], ["cudaarithm", "cudafilters"], []),
+                "cudalegacy": (["core", "video", "cudev"],
+                               ["objdetect", "imgproc", "calib3d", "cudaarithm", "cudafilters", "cudaimgproc"], []),
+                "cudaobjdetect": (["objdetect", "cudaarithm", "cudawarping", "cudev"], ["cudalegacy"], []),
+                "cudaoptflow": (["video", "optflow", "cudaarithm", "cudawarping", "cudaimgproc", "cudev"],
+                                ["cudalegacy"], []),
+                "cudastereo": (["calib3d", "cudev"], [], []),
+                "cudawarping": (["core", "imgproc", "cudev"], [], []),
+                "cudev": ([], [], []),
+            })
+
+        # drop the modules whose requirements are not built
+        removed = True
+        while removed:
+            removed = [name for name, (requires, _, _) in modules.items()
+                       if any(require not in modules for require in requires)]
+            for name in removed:
+                del modules[name]
+        return modules
+
+    @property
+    def _requested_modules(self):
+        if not self.options.modules:
+            return []
+        modules = [module.strip() for module in str(self.options.modules).split(",") if module.strip()]
+        return [module[len("opencv_"):] if module.startswith("opencv_") else module for module in modules]
+
+    @property
+    def _opencv_modules(self):
+        """modules to build: the requested ones and all the modules they require, or everything available"""
+        modules = self._available_opencv_modules
+        if not self.options.modules:
+            return modules
+        closure = set()
+        pending = [module for module in self._requested_modules if module in modules]
+        while pending:
+            module = pending.pop()
+            if module not in closure:
+                closure.add(module)
+                pending.extend(modules[module][0])
+        return {name: module for name, module in modules.items() if name in closure}
+
+    def add_libraries_from_pc(self, library, cpp_info=None):
+        cpp_info = cpp_info or self.cpp_info
+        pkg_config = tools.PkgConfig(library)
+        libs = [lib[2:] for lib in pkg_config.libs_only_l]  # cut -l prefix
+        lib_paths = [lib[2:]
+                     for lib in pkg_config.libs_only_L]  # cut -L prefix
+        cpp_info.libs.extend(libs)
+        cpp_info.libdirs.extend(lib_paths)
+        cpp_info.sharedlinkflags.extend(pkg_config.libs_only_other)
+        cpp_info.exelinkflags.extend(pkg_config.libs_only_other)
 
+    def package_info(self):
         suffix = 'd' if self.settings.build_type == 'Debug' and self.settings.os == "Windows" else ''
         version = self.version.replace(
             ".", "") if self.settings.os == "Windows" else ""
-        for lib in opencv_libs:
-            self.cpp_info.libs.append("opencv_%s%s%s" % (lib, version, suffix))
 
+        if self.settings.os == 'Android':
+            includedirs = []
+            libdirs = []
+            if not self.options.shared:
+                includedirs.append(os.path.join('sdk', 'native', 'jni', 'include'))
+                libdirs.append(os.path.join('sdk', 'native', 'staticlibs', self._android_arch))
+        else:
+            includedirs = [os.path.join('include', 'opencv4')]
+            libdirs = [os.path.join('lib', 'opencv4', '3rdparty')]
+
+        modules = self._opencv_modules
+        world_modules = [name for name in modules if name not in self._world_excluded_modules] \
+            if self.options.world else []
+
+        def library_component(module):
+            """component linking the library which contains the module"""
+            return self.cpp_info.components["opencv_world" if module in world_modules else "opencv_%s" % module]
+
+        if world_modules:
+            world = self.cpp_info.components["opencv_world"]
+            world.names["cmake_find_package"] = "opencv_world"
+            world.names["cmake_find_package_multi"] = "opencv_world"
+            world.libs = ["opencv_world%s%s" % (version, suffix)]
+            world.requires = sorted(set(dep for name in world_modules for dep in modules[name][2]))
+            world.includedirs.extend(includedirs)
+            world.libdirs.extend(libdirs)
+        for name, (requires, optional, deps) in modules.items():
+            component = self.cpp_info.components["opencv_%s" % name]
+            component.names["cmake_find_package"] = "opencv_%s" % name
+            component.names["cmake_find_package_multi"] = "opencv_%s" % name
+            component.includedirs.extend(includedirs)
+            component.libdirs.extend(libdirs)
+            if name in world_modules:
+                # alias of opencv_world, so that consumers keep linking the module components
+                component.requires = ["opencv_world"]
+                continue
+            component.libs = ["opencv_%s%s%s" % (name, version, suffix)]
+            component.requires = ["opencv_%s" % module for module in requires + optional if module in modules]
+            component.requires.extend(deps)
+
+        if "videoio" in modules and self._videoio_plugins:
+            # the plugins are loaded by opencv_videoio from its own folder on first use and nothing links them.
+            # Their requirements are private, the package has their shared libraries
+            folder = os.path.join(self.package_folder, self._videoio_plugin_requirements_folder)
+            self.env_info.LD_LIBRARY_PATH.append(folder)
+            self.env_info.DYLD_LIBRARY_PATH.append(folder)
+            self.env_info.PATH.append(folder)
+            if os.path.isdir(os.path.join(folder, "gstreamer-1.0")):
+                self.env_info.GST_PLUGIN_PATH.append(os.path.join(folder, "gstreamer-1.0"))
+
+        core = library_component("core")
+        if self.options.hal:
+            # the HAL is linked into every module
+            core.requires.append("%s::%s" % (self._hal_name, self._hal_name))
         if self.options.cuda:
-            self.cpp_info.libs.extend(["nvrtc", "cudart", "cuda"])
+            core.libs.extend(["nvrtc", "cudart", "cuda"])
 
         if self.settings.os == "Linux":
-            self.cpp_info.system_libs.extend([
+            core.system_libs.extend([
                 "pthread",
                 "m",
                 "dl"])
-            if self.options.gtk == 2:
-                self.add_libraries_from_pc('gtk+-2.0')
-            elif self.options.gtk == 3:
-                self.add_libraries_from_pc('gtk+-3.0')
+            if "highgui" in modules:
+                if self.options.gtk == 2:
+                    self.add_libraries_from_pc('gtk+-2.0', library_component("highgui"))
+                elif self.options.gtk == 3:
+                    self.add_libraries_from_pc('gtk+-3.0', library_component("highgui"))
         elif self.settings.os == 'Macos':
-            self.cpp_info.frameworks.extend(['OpenCL',
-                              'Accelerate',
-                              'CoreMedia',
-                              'CoreVideo',
-                              'CoreGraphics',
-                              'AVFoundation',
-                              'QuartzCore',
-                              'Cocoa'])
+            core.frameworks.extend(['OpenCL', 'Accelerate'])
+            if "videoio" in modules:
+                library_component("videoio").frameworks.extend(['CoreMedia',
+                                                                'CoreVideo',
+                                                                'AVFoundation',
+                                                                'QuartzCore'])
+            if "highgui" in modules:
+                library_component("highgui").frameworks.extend(['CoreGraphics',
+                                                                'Cocoa'])
         elif self.settings.os == 'Windows':
-            self.cpp_info.system_libs.append('Vfw32')
+            if "videoio" in modules:
+                library_component("videoio").system_libs.append('Vfw32')
         if self.settings.os == 'Android':
-            self.cpp_info.libs.extend(['log', 'cpufeatures'])
-            if not self.options.shared:
-                self.cpp_info.includedirs.append(
-                    os.path.join('sdk', 'native', 'jni', 'include'))
-                self.cpp_info.libdirs.append(
-                    os.path.join('sdk', 'native', 'staticlibs', self._android_arch))
-        else:
-            self.cpp_info.includedirs.append(
-                os.path.join('include', 'opencv4'))
-            self.cpp_info.libdirs.append(
-                os.path.join('lib', 'opencv4', '3rdparty'))
-            if not self.options.shared:
-                self.cpp_info.libs.append('ade')
-                if self.options.quirc:
-                    self.cpp_info.libs.append('quirc%s' % suffix)
-        if self.options.contrib and self.options.eigen and self.options.glog and self.options.gflags:
-            self.cpp_info.libs.append('multiview')
+            core.libs.extend(['log', 'cpufeatures'])
+        elif not self.options.shared:
+            if "gapi" in modules:
+                library_component("gapi").libs.append('ade')
+            if self.options.quirc and "objdetect" in modules:
+                library_component("objdetect").libs.append('quirc%s' % suffix)
+            if self._with_itt:
+                core.libs.append('ittnotify%s' % suffix)
+        if "sfm" in modules:
+            self.cpp_info.components["opencv_sfm"].libs.append('multiview')
+
+        self.user_info.cpu_baseline = self._cpu_baseline or "default"
+        self.user_info.cpu_dispatch = ",".join(self._cpu_dispatch) or "default"
+        if self.options.perf_tests:
+            self.user_info.perf_tests_runner = os.path.join(self.package_folder, "bin", "run_perf_tests.py")
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from conans import ConanFile, CMake, tools
+import os
+
+
+class OpenCVHalReferenceConan(ConanFile):
+    """Reference OpenCV HAL, to be used with opencv:hal=opencv_hal_reference/1.0@<user>/<channel>
+
+    OpenCV finds it with find_package(opencv_hal_reference NO_MODULE): the config file in the package root
+    sets OpenCV_HAL_LIBRARIES, OpenCV_HAL_HEADERS and OpenCV_HAL_INCLUDE_DIRS. The HAL header is included
+    by the core, imgproc and features2d sources after OpenCV's hal_ni_* fallbacks, and overrides them by
+    redefining the cv_hal_* macros.
+    """
+    name = "opencv_hal_reference"
+    version = "1.0"
+    license = "MIT"
+    description = "Reference hardware abstraction layer for OpenCV: BGR to gray conversion"
+    settings = "os", "compiler", "build_type", "arch"
+    exports_sources = ["CMakeLists.txt", "include/*", "src/*", "opencv_hal_referenceConfig.cmake"]
+    generators = "cmake"
+
+    def build(self):
+        cmake = CMake(self)
+        cmake.configure()
+        cmake.build()
+
+    def package(self):
+        self.copy("*.hpp", dst="include", src="include")
+        self.copy("*.lib", dst="lib", keep_path=False)
+        self.copy("*.a", dst="lib", keep_path=False)
+        self.copy("opencv_hal_referenceConfig.cmake")
+
+    def package_info(self):
+        # OpenCV links it into its modules, static consumers of OpenCV link it too
+        self.cpp_info.libs = ["opencv_hal_reference"]
@@ -0,0 +1,21 @@
+// Reference OpenCV HAL. OpenCV includes this header at the end of its hal_replacement.hpp files: every
+// cv_hal_* macro redefined here replaces the hal_ni_* fallback of OpenCV, which returns
+// CV_HAL_ERROR_NOT_IMPLEMENTED and lets OpenCV run its own implementation.
+//
+// Functions return CV_HAL_ERROR_OK (0) when they processed the data, CV_HAL_ERROR_NOT_IMPLEMENTED (1) to
+// fall back to OpenCV for the arguments they don't handle.
+#ifndef OPENCV_HAL_REFERENCE_HPP
+#define OPENCV_HAL_REFERENCE_HPP
+
+#include <cstddef>
+
+// 8 bit BGR, BGRA, RGB and RGBA to gray, with the coefficients and rounding of cv::cvtColor.
+// Setting OPENCV_HAL_REFERENCE=0 in the environment disables it, to compare with OpenCV's implementation.
+int opencv_hal_reference_cvtBGRtoGray(const unsigned char *src_data, size_t src_step,
+                                      unsigned char *dst_data, size_t dst_step,
+                                      int width, int height, int depth, int scn, bool swapBlue);
+
+#undef cv_hal_cvtBGRtoGray
+#define cv_hal_cvtBGRtoGray opencv_hal_reference_cvtBGRtoGray
+
+#endif
@@ -0,0 +1,7 @@
+# Read by OpenCV's configure step when OpenCV_HAL=opencv_hal_reference
+set(opencv_hal_reference_VERSION 1.0)
+
+set(OpenCV_HAL_LIBRARIES
+    "${CMAKE_CURRENT_LIST_DIR}/lib/${CMAKE_STATIC_LIBRARY_PREFIX}opencv_hal_reference${CMAKE_STATIC_LIBRARY_SUFFIX}")
+set(OpenCV_HAL_HEADERS "opencv_hal_reference.hpp")
+set(OpenCV_HAL_INCLUDE_DIRS "${CMAKE_CURRENT_LIST_DIR}/include")
@@ -0,0 +1,41 @@
+#include "opencv_hal_reference.hpp"
+
+#include <cstdlib>
+#include <cstring>
+
+namespace {
+
+// values of opencv2/core/hal/interface.h, the HAL doesn't depend on OpenCV headers
+const int HAL_ERROR_OK = 0;
+const int HAL_ERROR_NOT_IMPLEMENTED = 1;
+const int HAL_DEPTH_8U = 0;
+
+// cv::cvtColor fixed point coefficients of 8 bit images (ITU-R BT.601), 15 bits
+const int GRAY_SHIFT = 15;
+const int R2Y = 9798, G2Y = 19235, B2Y = 3735;
+
+bool enabled() {
+    static const bool enabled = [] {
+        const char *value = std::getenv("OPENCV_HAL_REFERENCE");
+        return !value || std::strcmp(value, "0") != 0;
+    }();
+    return enabled;
+}
+
+} // namespace
+
+int opencv_hal_reference_cvtBGRtoGray(const unsigned char *src_data, size_t src_step,
+                                      unsigned char *dst_data, size_t dst_step,
+                                      int width, int height, int depth, int scn, bool swapBlue) {
+    if (!enabled() || depth != HAL_DEPTH_8U || (scn != 3 && scn != 4))
+        return HAL_ERROR_NOT_IMPLEMENTED;
+    const int blue = swapBlue ? 2 : 0, red = swapBlue ? 0 : 2;
+    for (int y = 0; y < height; ++y) {
+        const unsigned char *src = src_data + y * src_step;
+        unsigned char *dst = dst_data + y * dst_step;
+        for (int x = 0; x < width; ++x, src += scn)
+            dst[x] = static_cast<unsigned char>(
+                (src[blue] * B2Y + src[1] * G2Y + src[red] * R2Y + (1 << (GRAY_SHIFT - 1))) >> GRAY_SHIFT);
+    }
+    return HAL_ERROR_OK;
+}
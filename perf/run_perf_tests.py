@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Runs the opencv_perf_* executables of a package built with opencv:perf_tests=True, offline, with the
+test data packaged in res/testdata.
+
+Every executable writes its gtest XML report (with the --perf_* metrics) to the output folder, and all of
+them are summarized in perf-digest.json: one entry per test, keyed by module and test name, so that the
+digests of two binary configurations can be compared with --baseline.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import xml.etree.ElementTree as ElementTree
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+
+def perf_executables(bin_folder, modules):
+    suffix = ".exe" if platform.system() == "Windows" else ""
+    executables = {}
+    for path in sorted(glob.glob(os.path.join(bin_folder, "opencv_perf_*" + suffix))):
+        module = os.path.basename(path)[len("opencv_perf_"):len(os.path.basename(path)) - len(suffix)]
+        if not modules or module in modules:
+            executables[module] = path
+    return executables
+
+
+def milliseconds(testcase, metric):
+    frequency = float(testcase.get("frequency", 0))
+    value = testcase.get(metric)
+    if not frequency or value is None:
+        return None
+    return float(value) * 1000.0 / frequency
+
+
+def digest_report(module, report):
+    tests = []
+    for testcase in ElementTree.parse(report).getroot().iter("testcase"):
+        name = "%s.%s" % (testcase.get("classname"), testcase.get("name"))
+        if testcase.get("value_param"):
+            name += "/%s" % testcase.get("value_param")
+        if testcase.find("failure") is not None:
+            status = "failed"
+        elif testcase.get("status") == "notrun" or testcase.get("custom_status") == "skipped" or \
+                testcase.get("samples") is None:
+            # tests skipped for missing test data don't report any metric
+            status = "skipped"
+        else:
+            status = "run"
+        test = {"module": module, "name": name, "status": status}
+        if status == "run":
+            test.update({"samples": int(testcase.get("samples")),
+                         "outliers": int(testcase.get("outliers", 0)),
+                         "min_ms": milliseconds(testcase, "min"),
+                         "median_ms": milliseconds(testcase, "median"),
+                         "gmean_ms": milliseconds(testcase, "gmean"),
+                         "mean_ms": milliseconds(testcase, "mean"),
+                         "stddev_ms": milliseconds(testcase, "stddev")})
+        tests.append(test)
+    return tests
+
+
+def compare(tests, baseline_file):
+    """adds the speedup of each test over the same test of a baseline digest, returns the geometric mean
+    of the speedups per module"""
+    with open(baseline_file) as f:
+        baseline = dict(((test["module"], test["name"]), test) for test in json.load(f)["tests"])
+    speedups = {}
+    for test in tests:
+        reference = baseline.get((test["module"], test["name"]))
+        if test["status"] != "run" or not reference or reference["status"] != "run" or not test["median_ms"]:
+            continue
+        test["baseline_median_ms"] = reference["median_ms"]
+        test["speedup"] = reference["median_ms"] / test["median_ms"]
+        speedups.setdefault(test["module"], []).append(test["speedup"])
+    return dict((module, math.exp(sum(math.log(s) for s in values) / len(values)))
+                for module, values in speedups.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bin", default=here, help="folder of the opencv_perf_* executables")
+    parser.add_argument("--testdata", default=os.path.join(here, os.pardir, "res", "testdata"),
+                        help="OPENCV_TEST_DATA_PATH of the tests")
+    parser.add_argument("--output", default="opencv-perf", help="folder of the XML reports and of the digest")
+    parser.add_argument("--modules", default="", help="comma separated modules to run, all by default")
+    parser.add_argument("--filter", default="*", help="gtest filter")
+    parser.add_argument("--samples", type=int, default=10, help="samples of each test")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="time limit of each test, in seconds")
+    parser.add_argument("--threads", type=int, default=-1, help="cv::setNumThreads of the tests")
+    parser.add_argument("--baseline", help="digest of a previous run to compare with")
+    args = parser.parse_args()
+
+    modules = [module.strip() for module in args.modules.split(",") if module.strip()]
+    executables = perf_executables(args.bin, modules)
+    if not executables:
+        sys.stderr.write("no opencv_perf_* executable found in %s\n" % args.bin)
+        return 1
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+
+    env = dict(os.environ)
+    # the tests must not look for data anywhere else (opencv_extra checkout, network)
+    env["OPENCV_TEST_DATA_PATH"] = os.path.abspath(args.testdata)
+    tests = []
+    crashed = []
+    for module, executable in sorted(executables.items()):
+        report = os.path.abspath(os.path.join(args.output, "opencv_perf_%s.xml" % module))
+        command = [executable,
+                   "--gtest_filter=%s" % args.filter,
+                   "--gtest_output=xml:%s" % report,
+                   "--perf_min_samples=%d" % args.samples,
+                   "--perf_force_samples=%d" % args.samples,
+                   "--perf_time_limit=%s" % args.time_limit,
+                   "--perf_threads=%d" % args.threads]
+        print(" ".join(command))
+        sys.stdout.flush()
+        returncode = subprocess.call(command, env=env)
+        # gtest exits with 1 when tests failed, the failures are part of the report
+        if returncode not in (0, 1) or not os.path.isfile(report):
+            crashed.append(module)
+            continue
+        tests.extend(digest_report(module, report))
+
+    summary = {}
+    for test in tests:
+        counts = summary.setdefault(test["module"], {"run": 0, "skipped": 0, "failed": 0})
+        counts[test["status"]] += 1
+    digest = {"configuration": {"platform": platform.platform(),
+                                "samples": args.samples,
+                                "time_limit": args.time_limit,
+                                "threads": args.threads,
+                                "filter": args.filter},
+              "summary": summary,
+              "crashed": crashed,
+              "tests": tests}
+    if args.baseline:
+        digest["speedup"] = compare(tests, args.baseline)
+    digest_file = os.path.join(args.output, "perf-digest.json")
+    with open(digest_file, "w") as f:
+        json.dump(digest, f, indent=2, sort_keys=True)
+
+    for module, counts in sorted(summary.items()):
+        line = "%-12s %5d run %5d skipped %5d failed" % (module, counts["run"], counts["skipped"], counts["failed"])
+        if module in digest.get("speedup", {}):
+            line += "  speedup %.3fx" % digest["speedup"][module]
+        print(line)
+    print("perf digest: %s" % os.path.abspath(digest_file))
+    failed = crashed or any(counts["failed"] for counts in summary.values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+// Training workload of opencv:pgo: the decode -> resize -> detect pipeline of the test_package
+// programs (load-image.cpp and lena.cpp), repeated on every test image the enabled codecs can read
+#include "opencv2/imgcodecs.hpp"
+#include "opencv2/imgproc.hpp"
+#include "opencv2/objdetect.hpp"
+
+#include <cstdlib>
+#include <iostream>
+#include <string>
+#include <vector>
+
+int main(int argc, const char** argv) {
+    if (argc != 4) {
+        std::cerr << "usage: " << argv[0] << " <images folder> <haarcascades folder> <iterations>\n";
+        return 1;
+    }
+    const std::string images = argv[1];
+    const std::string cascades = argv[2];
+    const int iterations = std::atoi(argv[3]);
+
+    cv::CascadeClassifier face_cascade, eyes_cascade;
+    if (!face_cascade.load(cascades + "/haarcascade_frontalface_alt.xml") ||
+        !eyes_cascade.load(cascades + "/haarcascade_eye_tree_eyeglasses.xml")) {
+        std::cerr << "Error: could not load the cascades from " << cascades << "\n";
+        return 1;
+    }
+
+    const char* names[] = {"lena.jpg", "normal.tiff", "lzma.tiff", "jbig.tiff"};
+    size_t decoded = 0, detections = 0;
+    for (int i = 0; i < iterations; ++i) {
+        for (const char* name : names) {
+            const std::string path = images + "/" + name;
+            cv::Mat image = cv::imread(path);
+            if (image.empty())
+                continue;  // codec not enabled
+
+            // encoders are part of the pipeline too: write the image back and decode it again
+            std::vector<uchar> buffer;
+            const std::string extension = path.substr(path.rfind('.'));
+            if (cv::imencode(extension, image, buffer))
+                image = cv::imdecode(buffer, cv::IMREAD_COLOR);
+            ++decoded;
+
+            cv::Mat resized, gray;
+            cv::resize(image, resized, cv::Size(), 1.5, 1.5, cv::INTER_LINEAR);
+            cv::cvtColor(resized, gray, cv::COLOR_BGR2GRAY);
+            cv::equalizeHist(gray, gray);
+
+            std::vector<cv::Rect> faces;
+            face_cascade.detectMultiScale(gray, faces, 1.1, 2, cv::CASCADE_SCALE_IMAGE, cv::Size(30, 30));
+            for (const cv::Rect& face : faces) {
+                std::vector<cv::Rect> eyes;
+                eyes_cascade.detectMultiScale(gray(face), eyes, 1.1, 2, cv::CASCADE_SCALE_IMAGE, cv::Size(30, 30));
+                detections += eyes.size();
+            }
+            detections += faces.size();
+        }
+    }
+    if (decoded == 0) {
+        std::cerr << "Error: none of the training images could be decoded\n";
+        return 1;
+    }
+    std::cout << "Trained on " << decoded << " images, " << detections << " detections\n";
+    return 0;
+}
@@ -0,0 +1,225 @@
+// Sustained imencode / imdecode / imread throughput of the image codecs enabled in the package.
+//
+// usage: benchmark-codecs [--output report.json] [--iterations n] [--threads n] [--size WxH]
+//                         [--images folder] [--label key=value]... codec...
+// codecs: jpeg png webp tiff tiff-lzma tiff-jbig jpeg2000 exr
+#include "opencv2/core.hpp"
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgcodecs.hpp"
+#include "opencv2/imgproc.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <cmath>
+#include <cstdio>
+#include <fstream>
+#include <iostream>
+#include <iterator>
+#include <string>
+#include <thread>
+#include <vector>
+
+namespace {
+
+const int TIFF_COMPRESSION_LZMA = 34925;  // COMPRESSION_LZMA of libtiff
+
+struct Codec {
+    const char *name;
+    const char *extension;
+    std::vector<int> params;
+    int type;
+    const char *fixture;  // decode only codecs (OpenCV can't encode them) read this test image instead
+};
+
+std::vector<Codec> codecs() {
+    return {
+        {"jpeg", ".jpg", {cv::IMWRITE_JPEG_QUALITY, 90}, CV_8UC3, nullptr},
+        {"png", ".png", {cv::IMWRITE_PNG_COMPRESSION, 3}, CV_8UC3, nullptr},
+        {"webp", ".webp", {cv::IMWRITE_WEBP_QUALITY, 90}, CV_8UC3, nullptr},
+        {"tiff", ".tiff", {}, CV_8UC3, nullptr},
+        {"tiff-lzma", ".tiff", {cv::IMWRITE_TIFF_COMPRESSION, TIFF_COMPRESSION_LZMA}, CV_8UC3, nullptr},
+        {"tiff-jbig", ".tiff", {}, CV_8UC3, "jbig.tiff"},
+        {"jpeg2000", ".jp2", {}, CV_8UC3, nullptr},
+        {"exr", ".exr", {}, CV_32FC3, nullptr},
+    };
+}
+
+// deterministic photo-like content: gradients, shapes and some noise, so that every run compresses the same way
+cv::Mat generate_image(cv::Size size, int type) {
+    cv::Mat image(size, CV_8UC3);
+    for (int y = 0; y < size.height; ++y) {
+        cv::Vec3b *row = image.ptr<cv::Vec3b>(y);
+        for (int x = 0; x < size.width; ++x)
+            row[x] = cv::Vec3b(cv::saturate_cast<uchar>(255 * x / size.width),
+                               cv::saturate_cast<uchar>(255 * y / size.height),
+                               cv::saturate_cast<uchar>(128 + 127 * std::sin((x + y) * 0.01)));
+    }
+    cv::RNG rng(12345);
+    for (int i = 0; i < 64; ++i) {
+        const cv::Point center(rng.uniform(0, size.width), rng.uniform(0, size.height));
+        const cv::Scalar color(rng.uniform(0, 256), rng.uniform(0, 256), rng.uniform(0, 256));
+        cv::circle(image, center, rng.uniform(8, std::max(9, size.height / 8)), color, cv::FILLED, cv::LINE_AA);
+    }
+    cv::Mat noise(size, CV_8UC3);
+    rng.fill(noise, cv::RNG::NORMAL, cv::Scalar::all(0), cv::Scalar::all(6));
+    image += noise;
+    if (type == CV_32FC3)
+        image.convertTo(image, CV_32FC3, 1.0 / 255);
+    return image;
+}
+
+double megabytes_per_second(size_t bytes, size_t images, double ms) {
+    return ms > 0 ? bytes * images / (1024.0 * 1024.0) / (ms / 1000.0) : 0;
+}
+
+double images_per_second(size_t images, double ms) {
+    return ms > 0 ? images / (ms / 1000.0) : 0;
+}
+
+// decodes the buffer from several threads at once, returns the wall time of the whole run
+double concurrent_decode(const std::vector<uchar> &buffer, int flags, int threads, int iterations) {
+    std::vector<std::thread> workers;
+    benchmark::Stopwatch wall;
+    for (int t = 0; t < threads; ++t) {
+        workers.emplace_back([&buffer, flags, iterations]() {
+            for (int i = 0; i < iterations; ++i)
+                cv::imdecode(buffer, flags);
+        });
+    }
+    for (auto &worker : workers)
+        worker.join();
+    return wall.elapsed_ms();
+}
+
+bool run(const Codec &codec, const benchmark::Options &options, cv::Size size, benchmark::Record &record) {
+    const int flags = codec.type == CV_32FC3 ? cv::IMREAD_UNCHANGED : cv::IMREAD_COLOR;
+    const int iterations = options.iterations;
+    std::vector<uchar> buffer;
+    cv::Mat image;
+    if (codec.fixture) {
+        const std::string path = options.value("images", ".") + "/" + codec.fixture;
+        image = cv::imread(path, flags);
+        if (image.empty())
+            return false;
+        std::ifstream file(path.c_str(), std::ios::binary);
+        buffer.assign(std::istreambuf_iterator<char>(file), std::istreambuf_iterator<char>());
+    } else {
+        image = generate_image(size, codec.type);
+        try {
+            if (!cv::imencode(codec.extension, image, buffer, codec.params) || cv::imdecode(buffer, flags).empty())
+                return false;
+        } catch (const cv::Exception &) {
+            return false;  // codec not built in
+        }
+    }
+    const size_t raw_bytes = image.total() * image.elemSize();
+    record.set("width", image.cols).set("height", image.rows)
+          .set("raw_bytes", raw_bytes).set("encoded_bytes", buffer.size())
+          .set("compression_ratio", static_cast<double>(raw_bytes) / buffer.size());
+
+    std::vector<double> samples;
+    if (!codec.fixture) {
+        std::vector<uchar> encoded;
+        for (int i = 0; i < iterations; ++i) {
+            benchmark::Stopwatch stopwatch;
+            cv::imencode(codec.extension, image, encoded, codec.params);
+            samples.push_back(stopwatch.elapsed_ms());
+        }
+        const benchmark::Latency encode = benchmark::summarize(samples);
+        record.set("encode", encode)
+              .set("encode_mb_per_s", megabytes_per_second(raw_bytes, iterations, encode.total_ms))
+              .set("encode_images_per_s", images_per_second(iterations, encode.total_ms));
+    }
+
+    samples.clear();
+    for (int i = 0; i < iterations; ++i) {
+        benchmark::Stopwatch stopwatch;
+        cv::imdecode(buffer, flags);
+        samples.push_back(stopwatch.elapsed_ms());
+    }
+    const benchmark::Latency decode = benchmark::summarize(samples);
+    record.set("decode", decode)
+          .set("decode_mb_per_s", megabytes_per_second(raw_bytes, iterations, decode.total_ms))
+          .set("decode_images_per_s", images_per_second(iterations, decode.total_ms));
+
+    // imread adds the file access on top of imdecode
+    const std::string path = std::string("benchmark-") + codec.name + codec.extension;
+    if (!codec.fixture)
+        cv::imwrite(path, image, codec.params);
+    const std::string read_path = codec.fixture ? options.value("images", ".") + "/" + codec.fixture : path;
+    samples.clear();
+    for (int i = 0; i < iterations; ++i) {
+        benchmark::Stopwatch stopwatch;
+        cv::imread(read_path, flags);
+        samples.push_back(stopwatch.elapsed_ms());
+    }
+    if (!codec.fixture)
+        std::remove(path.c_str());
+    const benchmark::Latency read = benchmark::summarize(samples);
+    record.set("imread", read)
+          .set("imread_mb_per_s", megabytes_per_second(raw_bytes, iterations, read.total_ms));
+
+    const int threads = options.threads ? options.threads : std::max(1u, std::thread::hardware_concurrency());
+    const double wall_ms = concurrent_decode(buffer, flags, threads, iterations);
+    record.set("threads", threads)
+          .set("decode_mt_mb_per_s", megabytes_per_second(raw_bytes, static_cast<size_t>(threads) * iterations, wall_ms))
+          .set("decode_mt_images_per_s", images_per_second(static_cast<size_t>(threads) * iterations, wall_ms));
+    return true;
+}
+
+} // namespace
+
+int main(int argc, const char **argv) {
+    benchmark::Options options;
+    if (!benchmark::parse_options(argc, argv, options))
+        return 1;
+    int width = 1920, height = 1080;
+    if (std::sscanf(options.value("size", "1920x1080").c_str(), "%dx%d", &width, &height) != 2 || width <= 0 || height <= 0) {
+        std::cerr << "--size expects WxH\n";
+        return 1;
+    }
+    std::vector<std::string> selected = options.arguments;
+    const std::vector<Codec> available = codecs();
+    if (selected.empty()) {
+        for (const Codec &codec : available)
+            selected.push_back(codec.name);
+    }
+
+    std::vector<benchmark::Record> results;
+    bool failed = false;
+    for (const std::string &name : selected) {
+        const Codec *codec = nullptr;
+        for (const Codec &candidate : available) {
+            if (name == candidate.name)
+                codec = &candidate;
+        }
+        if (!codec) {
+            std::cerr << "Error: unknown codec " << name << "\n";
+            return 1;
+        }
+        benchmark::Record record;
+        record.set("codec", name);
+        const bool supported = run(*codec, options, cv::Size(width, height), record);
+        record.set("supported", supported);
+        results.push_back(record);
+        if (!supported) {
+            // only requested codecs are benchmarked, so a missing one is a packaging error
+            std::cerr << "Error: " << name << " is not supported by this OpenCV build\n";
+            failed = true;
+            continue;
+        }
+        std::cout << record.json() << "\n";
+    }
+
+    if (!options.output.empty()) {
+        std::map<std::string, std::string> configuration = options.labels;
+        configuration["opencv_version"] = CV_VERSION;
+        configuration["iterations"] = std::to_string(options.iterations);
+        if (!benchmark::write_report(options.output, "codecs", configuration, results)) {
+            std::cerr << "Error: could not write " << options.output << "\n";
+            return 1;
+        }
+        std::cout << "Benchmark report written to " << options.output << "\n";
+    }
+    return failed ? 1 : 0;
+}
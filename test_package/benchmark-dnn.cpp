@@ -0,0 +1,174 @@
+// Inference with cv::dnn on the committed ONNX model (generate_dnn_model.py): model load time, first inference
+// latency (layer allocation and initialization included), then steady-state latency and batch throughput for
+// the targets of DNN_BACKEND_OPENCV and several thread counts.
+//
+// usage: benchmark-dnn [--output report.json] [--iterations n] [--threads max] [--model dnn-model.onnx]
+//                      [--batch n] [--label key=value]...
+#include "opencv2/core.hpp"
+#include "opencv2/core/ocl.hpp"
+#include "opencv2/core/utility.hpp"
+#include "opencv2/dnn.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <cmath>
+#include <cstdlib>
+#include <fstream>
+#include <iostream>
+#include <iterator>
+#include <string>
+#include <vector>
+
+namespace {
+
+struct Target {
+    const char *name;
+    int target;
+};
+
+std::vector<int> thread_counts(int max_threads) {
+    std::vector<int> counts;
+    for (int threads = 1; threads < max_threads; threads *= 2)
+        counts.push_back(threads);
+    counts.push_back(max_threads);
+    return counts;
+}
+
+cv::Mat input_blob(int batch) {
+    const int shape[] = {batch, 3, 224, 224};
+    cv::Mat blob(4, shape, CV_32F);
+    cv::RNG rng(12345);
+    rng.fill(blob, cv::RNG::UNIFORM, cv::Scalar::all(0), cv::Scalar::all(1));
+    return blob;
+}
+
+// the model ends with a softmax: every row of the output sums to 1
+bool valid_output(const cv::Mat &output, int batch) {
+    if (output.dims != 2 || output.size[0] != batch)
+        return false;
+    for (int i = 0; i < batch; ++i) {
+        if (std::abs(cv::sum(output.row(i))[0] - 1.0) > 1e-3)
+            return false;
+    }
+    return true;
+}
+
+} // namespace
+
+int main(int argc, const char **argv) {
+    benchmark::Options options;
+    if (!benchmark::parse_options(argc, argv, options))
+        return 1;
+    const std::string model = options.value("model", "dnn-model.onnx");
+    const int batch = std::max(1, std::atoi(options.value("batch", "8").c_str()));
+    const int max_threads = options.threads ? options.threads : cv::getNumberOfCPUs();
+
+    std::ifstream file(model.c_str(), std::ios::binary);
+    const std::vector<uchar> buffer((std::istreambuf_iterator<char>(file)), std::istreambuf_iterator<char>());
+    if (buffer.empty()) {
+        std::cerr << "Error: could not read " << model << "\n";
+        return 1;
+    }
+
+    // the first load of the process pays for the initialization of the dnn module
+    benchmark::Stopwatch cold_load;
+    cv::dnn::Net net = cv::dnn::readNet(model);
+    const double cold_load_ms = cold_load.elapsed_ms();
+    if (net.empty()) {
+        std::cerr << "Error: could not load " << model << "\n";
+        return 1;
+    }
+    std::vector<double> samples;
+    for (int i = 0; i < options.iterations; ++i) {
+        benchmark::Stopwatch stopwatch;
+        cv::dnn::readNetFromONNX(reinterpret_cast<const char *>(buffer.data()), buffer.size());
+        samples.push_back(stopwatch.elapsed_ms());
+    }
+    const benchmark::Latency load = benchmark::summarize(samples);
+
+    std::vector<benchmark::Record> results;
+    benchmark::Record load_record;
+    load_record.set("measure", "load").set("model", model).set("model_bytes", buffer.size())
+               .set("cold_load_ms", cold_load_ms).set("load", load);
+    std::cout << load_record.json() << "\n";
+    results.push_back(load_record);
+
+    std::vector<Target> targets = {{"CPU", cv::dnn::DNN_TARGET_CPU}};
+    if (cv::ocl::haveOpenCL()) {
+        targets.push_back({"OPENCL", cv::dnn::DNN_TARGET_OPENCL});
+        targets.push_back({"OPENCL_FP16", cv::dnn::DNN_TARGET_OPENCL_FP16});
+    }
+    const cv::Mat single = input_blob(1), batched = input_blob(batch);
+    bool failed = false;
+    for (const Target &target : targets) {
+        // OpenCL kernels don't use the CPU threads
+        const std::vector<int> threads_list = target.target == cv::dnn::DNN_TARGET_CPU ?
+            thread_counts(max_threads) : std::vector<int>(1, max_threads);
+        for (int threads : threads_list) {
+            cv::setNumThreads(threads);
+            cv::dnn::Net inference = cv::dnn::readNetFromONNX(reinterpret_cast<const char *>(buffer.data()),
+                                                              buffer.size());
+            inference.setPreferableBackend(cv::dnn::DNN_BACKEND_OPENCV);
+            inference.setPreferableTarget(target.target);
+
+            inference.setInput(single);
+            benchmark::Stopwatch first;
+            cv::Mat output = inference.forward();
+            const double first_inference_ms = first.elapsed_ms();
+            if (!valid_output(output, 1)) {
+                std::cerr << "Error: unexpected output for target " << target.name << "\n";
+                failed = true;
+                continue;
+            }
+
+            samples.clear();
+            for (int i = 0; i < options.iterations; ++i) {
+                benchmark::Stopwatch stopwatch;
+                inference.setInput(single);
+                inference.forward();
+                samples.push_back(stopwatch.elapsed_ms());
+            }
+            const benchmark::Latency latency = benchmark::summarize(samples);
+
+            inference.setInput(batched);
+            inference.forward();  // allocations for the batch size
+            samples.clear();
+            for (int i = 0; i < options.iterations; ++i) {
+                benchmark::Stopwatch stopwatch;
+                inference.setInput(batched);
+                output = inference.forward();
+                samples.push_back(stopwatch.elapsed_ms());
+            }
+            const benchmark::Latency batch_latency = benchmark::summarize(samples);
+            if (!valid_output(output, batch)) {
+                std::cerr << "Error: unexpected batch output for target " << target.name << "\n";
+                failed = true;
+                continue;
+            }
+
+            benchmark::Record record;
+            record.set("measure", "inference").set("backend", "OPENCV").set("target", target.name)
+                  .set("threads", threads).set("first_inference_ms", first_inference_ms)
+                  .set("latency", latency).set("batch", batch).set("batch_latency", batch_latency)
+                  .set("images_per_s", batch_latency.mean_ms > 0 ? batch * 1000.0 / batch_latency.mean_ms : 0);
+            std::cout << record.json() << "\n";
+            results.push_back(record);
+        }
+    }
+
+    if (!options.output.empty()) {
+        std::map<std::string, std::string> configuration = options.labels;
+        configuration["opencv_version"] = CV_VERSION;
+        configuration["iterations"] = std::to_string(options.iterations);
+        configuration["cpus"] = std::to_string(cv::getNumberOfCPUs());
+        // the framework running parallel_for_ (GCD on Apple platforms with opencv:parallel=None), rather than
+        // the option value
+        configuration["parallel"] = benchmark::build_information(cv::getBuildInformation(), "Parallel framework");
+        if (!benchmark::write_report(options.output, "dnn", configuration, results)) {
+            std::cerr << "Error: could not write " << options.output << "\n";
+            return 1;
+        }
+        std::cout << "Benchmark report written to " << options.output << "\n";
+    }
+    return failed ? 1 : 0;
+}
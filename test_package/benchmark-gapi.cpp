@@ -0,0 +1,210 @@
+// The preprocessing of lena.cpp (cvtColor to gray, equalizeHist) followed by a downscale and a 3x3 box blur,
+// either as plain imgproc calls or as a G-API graph: compiled with the CPU kernels (one OpenCV call per node,
+// full size intermediate images) or with the Fluid ones (the nodes run line by line in small ring buffers),
+// called frame by frame or as a streaming pipeline.
+//
+// usage: benchmark-gapi --mode imgproc|cpu|fluid|cpu-streaming|fluid-streaming [--size WxH] [--output report.json]
+//                       [--iterations n] [--threads n] [--label key=value]...
+// The peak RSS of a process is a high-water mark, so every mode and size runs in its own process.
+#include "opencv2/core.hpp"
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgproc.hpp"
+#include "opencv2/gapi.hpp"
+#include "opencv2/gapi/core.hpp"
+#include "opencv2/gapi/imgproc.hpp"
+#include "opencv2/gapi/cpu/core.hpp"
+#include "opencv2/gapi/cpu/imgproc.hpp"
+#include "opencv2/gapi/fluid/core.hpp"
+#include "opencv2/gapi/fluid/imgproc.hpp"
+#include "opencv2/gapi/streaming/source.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <cstdio>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#ifdef _WIN32
+#include <windows.h>
+#include <psapi.h>
+#else
+#include <sys/resource.h>
+#endif
+
+namespace {
+
+size_t peak_rss_bytes() {
+#ifdef _WIN32
+    PROCESS_MEMORY_COUNTERS counters;
+    if (!GetProcessMemoryInfo(GetCurrentProcess(), &counters, sizeof(counters)))
+        return 0;
+    return counters.PeakWorkingSetSize;
+#else
+    struct rusage usage;
+    if (getrusage(RUSAGE_SELF, &usage) != 0)
+        return 0;
+#ifdef __APPLE__
+    return static_cast<size_t>(usage.ru_maxrss);
+#else
+    return static_cast<size_t>(usage.ru_maxrss) * 1024;
+#endif
+#endif
+}
+
+void preprocess(const cv::Mat &frame, cv::Mat &gray, cv::Mat &resized, cv::Mat &output) {
+    cv::cvtColor(frame, gray, cv::COLOR_BGR2GRAY);
+    cv::equalizeHist(gray, gray);
+    cv::resize(gray, resized, cv::Size(frame.cols / 2, frame.rows / 2), 0, 0, cv::INTER_LINEAR);
+    cv::blur(resized, output, cv::Size(3, 3));
+}
+
+cv::GComputation preprocess_graph(cv::Size size) {
+    cv::GMat frame;
+    cv::GMat gray = cv::gapi::BGR2Gray(frame);
+    cv::GMat equalized = cv::gapi::equalizeHist(gray);
+    cv::GMat resized = cv::gapi::resize(equalized, cv::Size(size.width / 2, size.height / 2), 0, 0,
+                                        cv::INTER_LINEAR);
+    return cv::GComputation(cv::GIn(frame), cv::GOut(cv::gapi::blur(resized, cv::Size(3, 3))));
+}
+
+cv::gapi::GKernelPackage kernel_package(const std::string &backend) {
+    const cv::gapi::GKernelPackage cpu = cv::gapi::combine(cv::gapi::core::cpu::kernels(),
+                                                           cv::gapi::imgproc::cpu::kernels());
+    if (backend == "cpu")
+        return cpu;
+    // equalizeHist needs the histogram of the whole image and the Fluid resize only takes 3 channel images:
+    // both stay on the CPU backend, the rest of the graph runs on Fluid (the right package has precedence)
+    cv::gapi::GKernelPackage fluid = cv::gapi::combine(cv::gapi::core::fluid::kernels(),
+                                                       cv::gapi::imgproc::fluid::kernels());
+    fluid.remove<cv::gapi::core::GResize>();
+    return cv::gapi::combine(cpu, fluid);
+}
+
+// the same frame, count times
+class RepeatedFrames : public cv::gapi::wip::IStreamSource {
+public:
+    RepeatedFrames(const cv::Mat &frame, int count) : frame_(frame), count_(count) {}
+    bool pull(cv::gapi::wip::Data &data) override {
+        if (count_-- <= 0)
+            return false;
+        data = frame_;
+        return true;
+    }
+    cv::GMetaArg descr_of() const override { return cv::GMetaArg(cv::descr_of(frame_)); }
+private:
+    cv::Mat frame_;
+    int count_;
+};
+
+} // namespace
+
+int main(int argc, const char **argv) {
+    benchmark::Options options;
+    if (!benchmark::parse_options(argc, argv, options))
+        return 1;
+    const std::string mode = options.value("mode", "");
+    const bool streaming = mode == "cpu-streaming" || mode == "fluid-streaming";
+    const std::string backend = streaming ? mode.substr(0, mode.find('-')) : mode;
+    if (backend != "imgproc" && backend != "cpu" && backend != "fluid") {
+        std::cerr << "--mode expects imgproc, cpu, fluid, cpu-streaming or fluid-streaming\n";
+        return 1;
+    }
+    int width = 0, height = 0;
+    if (std::sscanf(options.value("size", "3840x2160").c_str(), "%dx%d", &width, &height) != 2 ||
+            width < 2 || height < 2) {
+        std::cerr << "--size expects WxH\n";
+        return 1;
+    }
+    if (options.threads)
+        cv::setNumThreads(options.threads);
+
+    const cv::Size size(width, height);
+    cv::Mat frame(size, CV_8UC3);
+    cv::RNG rng(12345);
+    rng.fill(frame, cv::RNG::UNIFORM, cv::Scalar::all(0), cv::Scalar::all(256));
+    cv::Mat output(height / 2, width / 2, CV_8UC1);
+    // what the process needs before running the pipeline: the frame, the output, OpenCV itself
+    const size_t baseline_rss = peak_rss_bytes();
+
+    std::vector<double> samples;
+    double compile_ms = 0, first_run_ms = 0;
+    if (backend == "imgproc") {
+        cv::Mat gray, resized;
+        benchmark::Stopwatch first;
+        preprocess(frame, gray, resized, output);
+        first_run_ms = first.elapsed_ms();
+        for (int i = 0; i < options.iterations; ++i) {
+            benchmark::Stopwatch stopwatch;
+            preprocess(frame, gray, resized, output);
+            samples.push_back(stopwatch.elapsed_ms());
+        }
+    } else if (!streaming) {
+        benchmark::Stopwatch compile;
+        cv::GCompiled compiled = preprocess_graph(size).compile(cv::descr_of(frame),
+                                                                cv::compile_args(kernel_package(backend)));
+        compile_ms = compile.elapsed_ms();
+        benchmark::Stopwatch first;
+        compiled(cv::gin(frame), cv::gout(output));
+        first_run_ms = first.elapsed_ms();
+        for (int i = 0; i < options.iterations; ++i) {
+            benchmark::Stopwatch stopwatch;
+            compiled(cv::gin(frame), cv::gout(output));
+            samples.push_back(stopwatch.elapsed_ms());
+        }
+    } else {
+        benchmark::Stopwatch compile;
+        cv::GStreamingCompiled pipeline = preprocess_graph(size).compileStreaming(
+            cv::GMetaArgs{cv::GMetaArg(cv::descr_of(frame))}, cv::compile_args(kernel_package(backend)));
+        compile_ms = compile.elapsed_ms();
+        // the islands of the graph run in their own threads, one frame after the other: the time between two
+        // frames is the throughput of the slowest island
+        pipeline.setSource(cv::gapi::wip::make_src<RepeatedFrames>(frame, options.iterations + 1));
+        benchmark::Stopwatch stopwatch;
+        pipeline.start();
+        bool first = true;
+        while (pipeline.pull(cv::gout(output))) {
+            if (first)
+                first_run_ms = stopwatch.elapsed_ms();
+            else
+                samples.push_back(stopwatch.elapsed_ms());
+            first = false;
+            stopwatch.restart();
+        }
+    }
+    const size_t peak_rss = peak_rss_bytes();
+    const benchmark::Latency latency = benchmark::summarize(samples);
+
+    // the reference is computed once everything is measured, not to count its buffers
+    cv::Mat gray, resized, reference;
+    preprocess(frame, gray, resized, reference);
+    cv::Mat difference;
+    cv::absdiff(output, reference, difference);
+
+    benchmark::Record record;
+    record.set("mode", mode).set("backend", backend).set("streaming", streaming)
+          .set("width", width).set("height", height).set("threads", cv::getNumThreads())
+          .set("compile_ms", compile_ms).set("first_run_ms", first_run_ms).set("latency", latency)
+          .set("frames_per_s", latency.mean_ms > 0 ? 1000.0 / latency.mean_ms : 0)
+          .set("megapixels_per_s", latency.mean_ms > 0 ? width * height / (1000.0 * latency.mean_ms) : 0)
+          .set("peak_rss_bytes", peak_rss)
+          .set("pipeline_rss_bytes", peak_rss > baseline_rss ? peak_rss - baseline_rss : static_cast<size_t>(0))
+          .set("checksum", static_cast<size_t>(cv::sum(output)[0]))
+          .set("max_abs_diff", cv::norm(difference, cv::NORM_INF))
+          .set("mean_abs_diff", cv::mean(difference)[0]);
+    std::cout << record.json() << "\n";
+
+    if (!options.output.empty()) {
+        std::map<std::string, std::string> configuration = options.labels;
+        configuration["opencv_version"] = CV_VERSION;
+        configuration["iterations"] = std::to_string(options.iterations);
+        configuration["cpus"] = std::to_string(cv::getNumberOfCPUs());
+        const std::vector<benchmark::Record> results(1, record);
+        if (!benchmark::write_report(options.output, "gapi", configuration, results)) {
+            std::cerr << "Error: could not write " << options.output << "\n";
+            return 1;
+        }
+        std::cout << "Benchmark report written to " << options.output << "\n";
+    }
+    return 0;
+}
@@ -0,0 +1,122 @@
+// imgproc primitives which a custom HAL (opencv:hal) can replace: color conversion, resize and warpAffine. The
+// "Custom HAL" line of cv::getBuildInformation() is part of the report, and every result has the sum of its
+// output, so that the runs with and without a HAL can be checked for the same results.
+//
+// usage: benchmark-hal [--output report.json] [--iterations n] [--sizes WxH,WxH...] [--require-hal name]
+//                      [--label key=value]...
+#include "opencv2/core.hpp"
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgproc.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <cstdio>
+#include <functional>
+#include <iostream>
+#include <sstream>
+#include <string>
+#include <vector>
+
+namespace {
+
+std::string custom_hal_build_information() {
+    std::istringstream lines(cv::getBuildInformation());
+    std::string line;
+    while (std::getline(lines, line)) {
+        const size_t start = line.find_first_not_of(' ');
+        if (start != std::string::npos && line.compare(start, 11, "Custom HAL:") == 0)
+            return line.substr(line.find_first_not_of(' ', start + 11));
+    }
+    return "NO";
+}
+
+std::vector<cv::Size> parse_sizes(const std::string &value) {
+    std::vector<cv::Size> sizes;
+    std::istringstream items(value);
+    std::string item;
+    while (std::getline(items, item, ',')) {
+        int width = 0, height = 0;
+        if (std::sscanf(item.c_str(), "%dx%d", &width, &height) != 2 || width <= 0 || height <= 0)
+            return std::vector<cv::Size>();
+        sizes.push_back(cv::Size(width, height));
+    }
+    return sizes;
+}
+
+struct Kernel {
+    std::string name;
+    std::function<void(const cv::Mat &, cv::Mat &)> run;
+    int type;
+};
+
+} // namespace
+
+int main(int argc, const char **argv) {
+    benchmark::Options options;
+    if (!benchmark::parse_options(argc, argv, options))
+        return 1;
+    const std::vector<cv::Size> sizes = parse_sizes(options.value("sizes", "640x480,1920x1080"));
+    if (sizes.empty()) {
+        std::cerr << "--sizes expects a comma separated list of WxH\n";
+        return 1;
+    }
+
+    const std::string hal = custom_hal_build_information();
+    std::cout << "Custom HAL: " << hal << "\n";
+    const std::string required = options.value("require-hal", "");
+    if (!required.empty() && hal.find(required) == std::string::npos) {
+        // the package was configured with opencv:hal but OpenCV's find_package didn't pick it up
+        std::cerr << "Error: OpenCV was built without the " << required << " HAL\n";
+        return 1;
+    }
+
+    const std::vector<Kernel> kernels = {
+        {"cvtColor_BGR2GRAY", [](const cv::Mat &src, cv::Mat &dst) { cv::cvtColor(src, dst, cv::COLOR_BGR2GRAY); },
+         CV_8UC3},
+        {"cvtColor_BGRA2GRAY", [](const cv::Mat &src, cv::Mat &dst) { cv::cvtColor(src, dst, cv::COLOR_BGRA2GRAY); },
+         CV_8UC4},
+        {"resize_linear", [](const cv::Mat &src, cv::Mat &dst) {
+            cv::resize(src, dst, cv::Size(), 0.5, 0.5, cv::INTER_LINEAR);
+        }, CV_8UC3},
+        {"warpAffine", [](const cv::Mat &src, cv::Mat &dst) {
+            const cv::Mat rotation = cv::getRotationMatrix2D(cv::Point2f(src.cols / 2.f, src.rows / 2.f), 30, 1);
+            cv::warpAffine(src, dst, rotation, src.size());
+        }, CV_8UC3},
+    };
+
+    std::vector<benchmark::Record> results;
+    for (const cv::Size &size : sizes) {
+        for (const Kernel &kernel : kernels) {
+            cv::Mat src(size, kernel.type), dst;
+            cv::RNG rng(12345);
+            rng.fill(src, cv::RNG::UNIFORM, cv::Scalar::all(0), cv::Scalar::all(256));
+            kernel.run(src, dst);  // warm up
+            std::vector<double> samples;
+            for (int i = 0; i < options.iterations; ++i) {
+                benchmark::Stopwatch stopwatch;
+                kernel.run(src, dst);
+                samples.push_back(stopwatch.elapsed_ms());
+            }
+            const cv::Scalar sum = cv::sum(dst);
+            benchmark::Record record;
+            record.set("kernel", kernel.name).set("width", size.width).set("height", size.height)
+                  .set("latency", benchmark::summarize(samples))
+                  .set("checksum", static_cast<size_t>(sum[0] + sum[1] + sum[2] + sum[3]));
+            std::cout << record.json() << "\n";
+            results.push_back(record);
+        }
+    }
+
+    if (!options.output.empty()) {
+        std::map<std::string, std::string> configuration = options.labels;
+        configuration["opencv_version"] = CV_VERSION;
+        configuration["iterations"] = std::to_string(options.iterations);
+        configuration["custom_hal_build_information"] = hal;
+        if (!benchmark::write_report(options.output, "hal", configuration, results)) {
+            std::cerr << "Error: could not write " << options.output << "\n";
+            return 1;
+        }
+        std::cout << "Benchmark report written to " << options.output << "\n";
+    }
+    return 0;
+}
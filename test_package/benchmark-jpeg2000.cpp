@@ -0,0 +1,102 @@
+// JPEG 2000 decoding of a large multi-tile image (archive.jp2, 4096x4096 in 16 tiles, see
+// generate_jpeg2000_image.py) by the jpeg2000 codec of the package, on 1 to n threads (cv::setNumThreads).
+// With opencv:openjpeg_threads the OpenJPEG decoder runs on cv::getNumThreads() threads, jasper and the
+// unpatched OpenJPEG decoder are single-threaded whatever the setting.
+//
+// usage: benchmark-jpeg2000 [--image archive.jp2] [--output report.json] [--iterations n] [--threads n]
+//                           [--label key=value]...
+#include "opencv2/core.hpp"
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgcodecs.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <fstream>
+#include <iostream>
+#include <string>
+#include <vector>
+
+namespace {
+
+size_t file_size(const std::string &path) {
+    std::ifstream file(path.c_str(), std::ios::binary | std::ios::ate);
+    return file ? static_cast<size_t>(file.tellg()) : 0;
+}
+
+size_t checksum(const cv::Mat &image) {
+    const cv::Scalar sum = cv::sum(image);
+    return static_cast<size_t>(sum[0] + sum[1] + sum[2] + sum[3]);
+}
+
+} // namespace
+
+int main(int argc, const char **argv) {
+    benchmark::Options options;
+    if (!benchmark::parse_options(argc, argv, options))
+        return 1;
+    const std::string path = options.value("image", "archive.jp2");
+    const size_t bytes = file_size(path);
+    if (!bytes || !cv::haveImageReader(path)) {
+        std::cerr << "Error: " << path << " is missing or OpenCV was built without a JPEG 2000 decoder\n";
+        return 1;
+    }
+    // 1, 2, 4... up to the requested number of threads or the number of CPUs
+    const int max_threads = options.threads ? options.threads : cv::getNumberOfCPUs();
+    std::vector<int> thread_counts;
+    for (int threads = 1; threads < max_threads; threads *= 2)
+        thread_counts.push_back(threads);
+    thread_counts.push_back(max_threads);
+
+    std::vector<benchmark::Record> results;
+    double single_thread_ms = 0;
+    size_t reference = 0;
+    for (int threads : thread_counts) {
+        cv::setNumThreads(threads);
+        benchmark::Stopwatch first;
+        cv::Mat image = cv::imread(path, cv::IMREAD_UNCHANGED);
+        const double first_ms = first.elapsed_ms();
+        if (image.empty()) {
+            std::cerr << "Error: could not decode " << path << "\n";
+            return 1;
+        }
+        std::vector<double> samples;
+        for (int i = 0; i < options.iterations; ++i) {
+            benchmark::Stopwatch stopwatch;
+            image = cv::imread(path, cv::IMREAD_UNCHANGED);
+            samples.push_back(stopwatch.elapsed_ms());
+        }
+        const benchmark::Latency latency = benchmark::summarize(samples);
+        if (threads == 1) {
+            single_thread_ms = latency.p50_ms;
+            reference = checksum(image);
+        }
+        // the decoded image must not depend on the number of threads
+        if (checksum(image) != reference) {
+            std::cerr << "Error: the image decoded on " << threads << " threads differs from the single-threaded one\n";
+            return 1;
+        }
+        benchmark::Record record;
+        record.set("threads", cv::getNumThreads()).set("width", image.cols).set("height", image.rows)
+              .set("channels", image.channels()).set("file_bytes", bytes)
+              .set("first_decode_ms", first_ms).set("decode", latency)
+              .set("megapixels_per_s", latency.p50_ms > 0 ? image.total() / (1000.0 * latency.p50_ms) : 0)
+              .set("speedup", latency.p50_ms > 0 ? single_thread_ms / latency.p50_ms : 0)
+              .set("checksum", checksum(image));
+        std::cout << record.json() << "\n";
+        results.push_back(record);
+    }
+
+    if (!options.output.empty()) {
+        std::map<std::string, std::string> configuration = options.labels;
+        configuration["opencv_version"] = CV_VERSION;
+        configuration["iterations"] = std::to_string(options.iterations);
+        configuration["cpus"] = std::to_string(cv::getNumberOfCPUs());
+        configuration["image"] = path;
+        if (!benchmark::write_report(options.output, "jpeg2000", configuration, results)) {
+            std::cerr << "Error: could not write " << options.output << "\n";
+            return 1;
+        }
+        std::cout << "Benchmark report written to " << options.output << "\n";
+    }
+    return 0;
+}
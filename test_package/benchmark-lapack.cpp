@@ -0,0 +1,122 @@
+// cv::gemm, cv::SVD and cv::solve, which go through the LAPACK/CBLAS HAL when OpenCV is built with lapack or
+// openblas. The "Lapack" line of cv::getBuildInformation() is part of the report, to tell the backend in use.
+//
+// usage: benchmark-lapack [--output report.json] [--iterations n] [--size n] [--require-lapack 1]
+//                         [--label key=value]...
+#include "opencv2/core.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <cstdlib>
+#include <iostream>
+#include <sstream>
+#include <string>
+#include <vector>
+
+namespace {
+
+std::string lapack_build_information() {
+    std::istringstream lines(cv::getBuildInformation());
+    std::string line;
+    while (std::getline(lines, line)) {
+        const size_t start = line.find_first_not_of(' ');
+        if (start != std::string::npos && line.compare(start, 7, "Lapack:") == 0)
+            return line.substr(line.find_first_not_of(' ', start + 7));
+    }
+    return "NO";
+}
+
+cv::Mat random_matrix(int size, int type, uint64 seed) {
+    cv::Mat matrix(size, size, type);
+    cv::RNG rng(seed);
+    rng.fill(matrix, cv::RNG::UNIFORM, cv::Scalar::all(-1), cv::Scalar::all(1));
+    return matrix;
+}
+
+template <typename Operation>
+benchmark::Latency measure(int iterations, Operation operation) {
+    operation();  // warm up
+    std::vector<double> samples;
+    for (int i = 0; i < iterations; ++i) {
+        benchmark::Stopwatch stopwatch;
+        operation();
+        samples.push_back(stopwatch.elapsed_ms());
+    }
+    return benchmark::summarize(samples);
+}
+
+double gflops(double operations, double ms) {
+    return ms > 0 ? operations / (ms * 1e6) : 0;
+}
+
+} // namespace
+
+int main(int argc, const char **argv) {
+    benchmark::Options options;
+    if (!benchmark::parse_options(argc, argv, options))
+        return 1;
+    const int n = std::atoi(options.value("size", "512").c_str());
+    if (n <= 0) {
+        std::cerr << "--size expects a positive matrix size\n";
+        return 1;
+    }
+
+    const std::string lapack = lapack_build_information();
+    std::cout << "Lapack: " << lapack << "\n";
+    if (options.value("require-lapack", "0") != "0" && lapack.compare(0, 2, "NO") == 0) {
+        // the package was configured with a LAPACK backend but OpenCV's check rejected it
+        std::cerr << "Error: OpenCV was built without its LAPACK HAL\n";
+        return 1;
+    }
+
+    std::vector<benchmark::Record> results;
+    const int types[] = {CV_32F, CV_64F};
+    for (int type : types) {
+        const std::string depth = type == CV_32F ? "32f" : "64f";
+        const cv::Mat a = random_matrix(n, type, 1), b = random_matrix(n, type, 2);
+        cv::Mat rhs = random_matrix(n, type, 3).colRange(0, 1).clone();
+        cv::Mat c, w, u, vt, x;
+
+        const benchmark::Latency gemm = measure(options.iterations, [&]() { cv::gemm(a, b, 1, cv::noArray(), 0, c); });
+        benchmark::Record gemm_record;
+        gemm_record.set("operation", "gemm").set("depth", depth).set("size", n).set("latency", gemm)
+                   .set("gflops", gflops(2.0 * n * n * n, gemm.mean_ms));
+        results.push_back(gemm_record);
+
+        const benchmark::Latency svd = measure(options.iterations, [&]() { cv::SVD::compute(a, w, u, vt); });
+        benchmark::Record svd_record;
+        svd_record.set("operation", "SVD").set("depth", depth).set("size", n).set("latency", svd);
+        results.push_back(svd_record);
+
+        const benchmark::Latency solve_lu = measure(options.iterations, [&]() { cv::solve(a, rhs, x, cv::DECOMP_LU); });
+        benchmark::Record lu_record;
+        lu_record.set("operation", "solve_lu").set("depth", depth).set("size", n).set("latency", solve_lu)
+                 .set("gflops", gflops(2.0 / 3.0 * n * n * n, solve_lu.mean_ms));
+        results.push_back(lu_record);
+
+        // a * a^T is symmetric positive definite
+        cv::Mat spd;
+        cv::mulTransposed(a, spd, false);
+        const benchmark::Latency solve_cholesky = measure(options.iterations, [&]() {
+            cv::solve(spd, rhs, x, cv::DECOMP_CHOLESKY);
+        });
+        benchmark::Record cholesky_record;
+        cholesky_record.set("operation", "solve_cholesky").set("depth", depth).set("size", n).set("latency", solve_cholesky);
+        results.push_back(cholesky_record);
+    }
+    for (const benchmark::Record &record : results)
+        std::cout << record.json() << "\n";
+
+    if (!options.output.empty()) {
+        std::map<std::string, std::string> configuration = options.labels;
+        configuration["opencv_version"] = CV_VERSION;
+        configuration["iterations"] = std::to_string(options.iterations);
+        configuration["lapack_build_information"] = lapack;
+        if (!benchmark::write_report(options.output, "lapack", configuration, results)) {
+            std::cerr << "Error: could not write " << options.output << "\n";
+            return 1;
+        }
+        std::cout << "Benchmark report written to " << options.output << "\n";
+    }
+    return 0;
+}
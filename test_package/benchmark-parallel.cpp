@@ -0,0 +1,137 @@
+// Scaling of parallel_for_ backed kernels with cv::setNumThreads, for the parallel framework of the package.
+//
+// usage: benchmark-parallel [--output report.json] [--iterations n] [--threads max] [--label key=value]...
+// Every kernel runs on a large image (speedup curve) and on a small one, where the cost of dispatching
+// the work to the thread pool dominates. The thread counts go up to twice --threads (default: all cores)
+// to show the effect of oversubscription.
+#include "opencv2/core.hpp"
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgproc.hpp"
+#ifdef BENCHMARK_WITH_OBJDETECT
+#include "opencv2/imgcodecs.hpp"
+#include "opencv2/objdetect.hpp"
+#endif
+
+#include "benchmark_utils.hpp"
+
+#include <functional>
+#include <iostream>
+#include <memory>
+#include <string>
+#include <vector>
+
+namespace {
+
+struct Kernel {
+    std::string name;
+    std::string image;
+    cv::Size size;
+    std::function<void()> run;
+};
+
+cv::Mat generate_image(cv::Size size) {
+    cv::Mat image(size, CV_8UC3);
+    cv::RNG rng(12345);
+    rng.fill(image, cv::RNG::UNIFORM, cv::Scalar::all(0), cv::Scalar::all(256));
+    return image;
+}
+
+void add_imgproc_kernels(std::vector<Kernel> &kernels, const std::string &image_name, const cv::Mat &image) {
+    // the lambdas own their buffers, so that the measurements don't include allocations
+    std::shared_ptr<cv::Mat> resized = std::make_shared<cv::Mat>(), blurred = std::make_shared<cv::Mat>(),
+                             gray = std::make_shared<cv::Mat>();
+    kernels.push_back({"resize", image_name, image.size(), [image, resized]() {
+        cv::resize(image, *resized, cv::Size(), 0.5, 0.5, cv::INTER_LINEAR);
+    }});
+    kernels.push_back({"GaussianBlur", image_name, image.size(), [image, blurred]() {
+        cv::GaussianBlur(image, *blurred, cv::Size(7, 7), 0);
+    }});
+    kernels.push_back({"cvtColor", image_name, image.size(), [image, gray]() {
+        cv::cvtColor(image, *gray, cv::COLOR_BGR2GRAY);
+    }});
+}
+
+std::vector<int> thread_counts(int max_threads) {
+    std::vector<int> counts;
+    for (int threads = 1; threads < max_threads; threads *= 2)
+        counts.push_back(threads);
+    counts.push_back(max_threads);
+    counts.push_back(2 * max_threads);
+    return counts;
+}
+
+} // namespace
+
+int main(int argc, const char **argv) {
+    benchmark::Options options;
+    if (!benchmark::parse_options(argc, argv, options))
+        return 1;
+    const int max_threads = options.threads ? options.threads : cv::getNumberOfCPUs();
+
+    std::vector<Kernel> kernels;
+    add_imgproc_kernels(kernels, "large", generate_image(cv::Size(1920, 1080)));
+    add_imgproc_kernels(kernels, "small", generate_image(cv::Size(64, 48)));
+#ifdef BENCHMARK_WITH_OBJDETECT
+    // the face detection of lena.cpp
+    std::shared_ptr<cv::CascadeClassifier> face_cascade = std::make_shared<cv::CascadeClassifier>();
+    if (!face_cascade->load(options.value("cascade", "haarcascades/haarcascade_frontalface_alt.xml"))) {
+        std::cerr << "Error: could not load the face cascade\n";
+        return 1;
+    }
+    cv::Mat lena = cv::imread(options.value("image", "lena.jpg"), cv::IMREAD_GRAYSCALE);
+    if (lena.empty()) {
+        std::cerr << "Error: could not load lena.jpg\n";
+        return 1;
+    }
+    cv::equalizeHist(lena, lena);
+    std::shared_ptr<std::vector<cv::Rect> > faces = std::make_shared<std::vector<cv::Rect> >();
+    kernels.push_back({"detectMultiScale", "lena", lena.size(), [face_cascade, lena, faces]() {
+        face_cascade->detectMultiScale(lena, *faces, 1.1, 2, cv::CASCADE_SCALE_IMAGE, cv::Size(30, 30));
+    }});
+#endif
+
+    std::vector<benchmark::Record> results;
+    for (const Kernel &kernel : kernels) {
+        double single_thread_ms = 0;
+        for (int threads : thread_counts(max_threads)) {
+            cv::setNumThreads(threads);
+            kernel.run();  // warm up the thread pool and the caches
+            std::vector<double> samples;
+            for (int i = 0; i < options.iterations; ++i) {
+                benchmark::Stopwatch stopwatch;
+                kernel.run();
+                samples.push_back(stopwatch.elapsed_ms());
+            }
+            const benchmark::Latency latency = benchmark::summarize(samples);
+            if (threads == 1)
+                single_thread_ms = latency.mean_ms;
+            const double speedup = latency.mean_ms > 0 ? single_thread_ms / latency.mean_ms : 0;
+            benchmark::Record record;
+            record.set("kernel", kernel.name).set("image", kernel.image)
+                  .set("width", kernel.size.width).set("height", kernel.size.height)
+                  .set("threads", threads).set("latency", latency)
+                  .set("speedup", speedup).set("efficiency", speedup / threads)
+                  // time lost compared to an ideal split of the single thread run: dispatch, synchronization
+                  // and load imbalance
+                  .set("overhead_us", (latency.mean_ms - single_thread_ms / threads) * 1000);
+            std::cout << record.json() << "\n";
+            results.push_back(record);
+        }
+    }
+
+    if (!options.output.empty()) {
+        std::map<std::string, std::string> configuration = options.labels;
+        configuration["opencv_version"] = CV_VERSION;
+        configuration["iterations"] = std::to_string(options.iterations);
+        configuration["cpus"] = std::to_string(cv::getNumberOfCPUs());
+        // the framework running parallel_for_ (GCD on Apple platforms with opencv:parallel=None), rather than
+        // the option value
+        configuration["parallel"] = benchmark::build_information(cv::getBuildInformation(), "Parallel framework");
+        if (!benchmark::write_report(options.output, "parallel", configuration, results)) {
+            std::cerr << "Error: could not write " << options.output << "\n";
+            return 1;
+        }
+        std::cout << "Benchmark report written to " << options.output << "\n";
+    }
+    return 0;
+}
@@ -0,0 +1,214 @@
+// videoio throughput of one backend, offline: a clip is encoded with cv::VideoWriter from lena.jpg (shifted by a
+// few pixels every frame) for every codec and size, then decoded with cv::VideoCapture and read at random
+// positions. A backend which can't write and read back MJPG is misconfigured and fails the benchmark, the
+// other codecs (H.264) are reported as unsupported when the backend has no encoder for them.
+//
+// usage: benchmark-video --backend FFMPEG|GSTREAMER|CV_MJPEG [--codecs MJPG,H264] [--sizes WxH,WxH...]
+//                        [--frames n] [--image lena.jpg] [--output report.json] [--iterations n] [--label key=value]...
+#include "opencv2/core.hpp"
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgcodecs.hpp"
+#include "opencv2/imgproc.hpp"
+#include "opencv2/videoio.hpp"
+#include "opencv2/videoio/registry.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <algorithm>
+#include <cstdio>
+#include <cstdlib>
+#include <fstream>
+#include <iostream>
+#include <sstream>
+#include <string>
+#include <vector>
+
+namespace {
+
+struct Codec {
+    const char *name;
+    int fourcc;
+    const char *extension;
+};
+
+const Codec codecs[] = {
+    {"MJPG", cv::VideoWriter::fourcc('M', 'J', 'P', 'G'), ".avi"},
+    {"H264", cv::VideoWriter::fourcc('a', 'v', 'c', '1'), ".mp4"},
+};
+
+std::vector<std::string> split(const std::string &value) {
+    std::vector<std::string> items;
+    std::istringstream stream(value);
+    std::string item;
+    while (std::getline(stream, item, ','))
+        items.push_back(item);
+    return items;
+}
+
+std::vector<cv::Size> parse_sizes(const std::string &value) {
+    std::vector<cv::Size> sizes;
+    for (const std::string &item : split(value)) {
+        int width = 0, height = 0;
+        if (std::sscanf(item.c_str(), "%dx%d", &width, &height) != 2 || width <= 0 || height <= 0)
+            return std::vector<cv::Size>();
+        sizes.push_back(cv::Size(width, height));
+    }
+    return sizes;
+}
+
+// frame index of the clip: the image moves right by 4 pixels per frame, so that the encoders see motion
+void generate_frame(const cv::Mat &image, int index, cv::Mat &frame) {
+    const int shift = (4 * index) % image.cols;
+    if (!shift) {
+        image.copyTo(frame);
+        return;
+    }
+    frame.create(image.size(), image.type());
+    image.colRange(image.cols - shift, image.cols).copyTo(frame.colRange(0, shift));
+    image.colRange(0, image.cols - shift).copyTo(frame.colRange(shift, frame.cols));
+}
+
+size_t file_size(const std::string &path) {
+    std::ifstream file(path.c_str(), std::ios::binary | std::ios::ate);
+    return file ? static_cast<size_t>(file.tellg()) : 0;
+}
+
+} // namespace
+
+int main(int argc, const char **argv) {
+    benchmark::Options options;
+    if (!benchmark::parse_options(argc, argv, options))
+        return 1;
+    const std::string backend_name = options.value("backend", "");
+    const cv::VideoCaptureAPIs candidates[] = {cv::CAP_FFMPEG, cv::CAP_GSTREAMER, cv::CAP_OPENCV_MJPEG};
+    cv::VideoCaptureAPIs backend = cv::CAP_ANY;
+    for (cv::VideoCaptureAPIs candidate : candidates) {
+        if (cv::videoio_registry::getBackendName(candidate) == backend_name)
+            backend = candidate;
+    }
+    if (backend == cv::CAP_ANY) {
+        std::cerr << "--backend expects FFMPEG, GSTREAMER or CV_MJPEG\n";
+        return 1;
+    }
+    if (!cv::videoio_registry::hasBackend(backend)) {
+        std::cerr << "Error: OpenCV was built without the " << backend_name << " backend\n";
+        return 1;
+    }
+    const std::vector<std::string> codec_names = split(options.value("codecs", "MJPG,H264"));
+    const std::vector<cv::Size> sizes = parse_sizes(options.value("sizes", "640x480,1280x720,1920x1080"));
+    if (sizes.empty()) {
+        std::cerr << "--sizes expects a comma separated list of WxH\n";
+        return 1;
+    }
+    const int frames = std::max(2, std::atoi(options.value("frames", "60").c_str()));
+    const cv::Mat image = cv::imread(options.value("image", "lena.jpg"));
+    if (image.empty()) {
+        std::cerr << "Error: could not read " << options.value("image", "lena.jpg") << "\n";
+        return 1;
+    }
+
+    std::vector<benchmark::Record> results;
+    bool failed = false;
+    for (const Codec &codec : codecs) {
+        if (std::find(codec_names.begin(), codec_names.end(), codec.name) == codec_names.end())
+            continue;
+        for (const cv::Size &size : sizes) {
+            benchmark::Record record;
+            record.set("backend", backend_name).set("codec", codec.name)
+                  .set("width", size.width).set("height", size.height).set("frames", frames);
+            const std::string path = std::string("benchmark-video-") + backend_name + "-" + codec.name + "-" +
+                                     std::to_string(size.width) + "x" + std::to_string(size.height) + codec.extension;
+            cv::Mat resized, frame;
+            cv::resize(image, resized, size, 0, 0, cv::INTER_AREA);
+
+            cv::VideoWriter writer(path, backend, codec.fourcc, 30, size, true);
+            if (!writer.isOpened()) {
+                record.set("status", "unsupported");
+                std::cout << record.json() << "\n";
+                results.push_back(record);
+                if (std::string(codec.name) == "MJPG") {
+                    std::cerr << "Error: the " << backend_name << " backend can't write " << path << "\n";
+                    failed = true;
+                }
+                continue;
+            }
+            std::vector<double> samples;
+            double encode_ms = 0;
+            for (int i = 0; i < frames; ++i) {
+                generate_frame(resized, i, frame);
+                benchmark::Stopwatch stopwatch;
+                writer.write(frame);
+                samples.push_back(stopwatch.elapsed_ms());
+                encode_ms += samples.back();
+            }
+            // buffered frames and the container trailer are written on release
+            benchmark::Stopwatch finalize;
+            writer.release();
+            encode_ms += finalize.elapsed_ms();
+            const size_t bytes = file_size(path);
+            record.set("encode", benchmark::summarize(samples))
+                  .set("encode_fps", encode_ms > 0 ? frames * 1000.0 / encode_ms : 0)
+                  .set("file_bytes", bytes)
+                  .set("bitrate_kbps", bytes * 8.0 * 30 / frames / 1000);
+
+            benchmark::Stopwatch open;
+            cv::VideoCapture capture(path, backend);
+            const double open_ms = open.elapsed_ms();
+            samples.clear();
+            double decode_ms = 0;
+            int decoded = 0;
+            while (capture.isOpened()) {
+                benchmark::Stopwatch stopwatch;
+                if (!capture.read(frame))
+                    break;
+                samples.push_back(stopwatch.elapsed_ms());
+                decode_ms += samples.back();
+                ++decoded;
+            }
+            if (!decoded) {
+                std::cerr << "Error: the " << backend_name << " backend can't read " << path << "\n";
+                record.set("status", "unreadable");
+                std::cout << record.json() << "\n";
+                results.push_back(record);
+                failed = true;
+                std::remove(path.c_str());
+                continue;
+            }
+            record.set("status", "ok").set("open_ms", open_ms).set("decoded_frames", decoded)
+                  .set("decode", benchmark::summarize(samples))
+                  .set("decode_fps", decode_ms > 0 ? decoded * 1000.0 / decode_ms : 0);
+
+            // seek to a random frame and decode it, positions which land elsewhere are counted
+            cv::RNG rng(12345);
+            samples.clear();
+            int inexact_seeks = 0;
+            for (int i = 0; i < options.iterations; ++i) {
+                const int position = rng.uniform(0, decoded);
+                benchmark::Stopwatch stopwatch;
+                const bool read = capture.set(cv::CAP_PROP_POS_FRAMES, position) && capture.read(frame);
+                samples.push_back(stopwatch.elapsed_ms());
+                if (!read || static_cast<int>(capture.get(cv::CAP_PROP_POS_FRAMES)) != position + 1)
+                    ++inexact_seeks;
+            }
+            record.set("seek", benchmark::summarize(samples)).set("inexact_seeks", inexact_seeks);
+            capture.release();
+            std::remove(path.c_str());
+
+            std::cout << record.json() << "\n";
+            results.push_back(record);
+        }
+    }
+
+    if (!options.output.empty()) {
+        std::map<std::string, std::string> configuration = options.labels;
+        configuration["opencv_version"] = CV_VERSION;
+        configuration["iterations"] = std::to_string(options.iterations);
+        configuration["backend"] = backend_name;
+        if (!benchmark::write_report(options.output, "video", configuration, results)) {
+            std::cerr << "Error: could not write " << options.output << "\n";
+            return 1;
+        }
+        std::cout << "Benchmark report written to " << options.output << "\n";
+    }
+    return failed ? 1 : 0;
+}
@@ -0,0 +1,199 @@
+// Helpers shared by the test_package benchmarks: timing, latency statistics and a minimal JSON report.
+#ifndef TEST_PACKAGE_BENCHMARK_UTILS_HPP
+#define TEST_PACKAGE_BENCHMARK_UTILS_HPP
+
+#include <algorithm>
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <fstream>
+#include <map>
+#include <sstream>
+#include <string>
+#include <utility>
+#include <vector>
+
+namespace benchmark {
+
+class Stopwatch {
+public:
+    Stopwatch() : start_(std::chrono::steady_clock::now()) {}
+    void restart() { start_ = std::chrono::steady_clock::now(); }
+    double elapsed_ms() const {
+        return std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - start_).count();
+    }
+private:
+    std::chrono::steady_clock::time_point start_;
+};
+
+struct Latency {
+    double mean_ms;
+    double min_ms;
+    double p50_ms;
+    double p99_ms;
+    double total_ms;
+};
+
+// nearest-rank percentiles of the per-iteration timings
+inline Latency summarize(std::vector<double> samples_ms) {
+    Latency latency = {0, 0, 0, 0, 0};
+    if (samples_ms.empty())
+        return latency;
+    std::sort(samples_ms.begin(), samples_ms.end());
+    for (double sample : samples_ms)
+        latency.total_ms += sample;
+    const size_t count = samples_ms.size();
+    latency.mean_ms = latency.total_ms / count;
+    latency.min_ms = samples_ms.front();
+    latency.p50_ms = samples_ms[(count - 1) / 2];
+    latency.p99_ms = samples_ms[std::min(count - 1, (count * 99 + 99) / 100 - 1)];
+    return latency;
+}
+
+inline std::string json_string(const std::string &value) {
+    std::string escaped = "\"";
+    for (char c : value) {
+        switch (c) {
+        case '"': escaped += "\\\""; break;
+        case '\\': escaped += "\\\\"; break;
+        case '\n': escaped += "\\n"; break;
+        case '\t': escaped += "\\t"; break;
+        default:
+            if (static_cast<unsigned char>(c) < 0x20) {
+                char buffer[8];
+                std::snprintf(buffer, sizeof(buffer), "\\u%04x", c);
+                escaped += buffer;
+            } else {
+                escaped += c;
+            }
+        }
+    }
+    return escaped + "\"";
+}
+
+inline std::string json_number(double value) {
+    std::ostringstream stream;
+    stream.precision(6);
+    stream << value;
+    return stream.str();
+}
+
+// One row of a benchmark report, fields are kept in insertion order
+class Record {
+public:
+    Record &set(const std::string &key, const std::string &value) { return set_raw(key, json_string(value)); }
+    Record &set(const std::string &key, const char *value) { return set_raw(key, json_string(value)); }
+    Record &set(const std::string &key, double value) { return set_raw(key, json_number(value)); }
+    Record &set(const std::string &key, int value) { return set_raw(key, std::to_string(value)); }
+    Record &set(const std::string &key, size_t value) { return set_raw(key, std::to_string(value)); }
+    Record &set(const std::string &key, bool value) { return set_raw(key, value ? "true" : "false"); }
+    Record &set(const std::string &key, const Latency &latency) {
+        set(key + "_mean_ms", latency.mean_ms);
+        set(key + "_p50_ms", latency.p50_ms);
+        return set(key + "_p99_ms", latency.p99_ms);
+    }
+    std::string json() const {
+        std::string json = "{";
+        for (size_t i = 0; i < fields_.size(); ++i)
+            json += (i ? ", " : "") + json_string(fields_[i].first) + ": " + fields_[i].second;
+        return json + "}";
+    }
+private:
+    Record &set_raw(const std::string &key, const std::string &value) {
+        for (auto &field : fields_) {
+            if (field.first == key) {
+                field.second = value;
+                return *this;
+            }
+        }
+        fields_.emplace_back(key, value);
+        return *this;
+    }
+    std::vector<std::pair<std::string, std::string> > fields_;
+};
+
+// {"benchmark": name, "configuration": {...}, "results": [...]}
+inline bool write_report(const std::string &path, const std::string &name,
+                         const std::map<std::string, std::string> &configuration,
+                         const std::vector<Record> &results) {
+    std::ofstream output(path.c_str());
+    output << "{\n  \"benchmark\": " << json_string(name) << ",\n  \"configuration\": {";
+    bool first = true;
+    for (const auto &entry : configuration) {
+        output << (first ? "" : ", ") << json_string(entry.first) << ": " << json_string(entry.second);
+        first = false;
+    }
+    output << "},\n  \"results\": [";
+    for (size_t i = 0; i < results.size(); ++i)
+        output << (i ? ",\n    " : "\n    ") << results[i].json();
+    output << "\n  ]\n}\n";
+    return output.good();
+}
+
+// Value of a "Key: value" line of cv::getBuildInformation(), empty when it is missing
+inline std::string build_information(const std::string &build_information, const std::string &key) {
+    std::istringstream lines(build_information);
+    std::string line;
+    while (std::getline(lines, line)) {
+        const size_t start = line.find_first_not_of(' ');
+        if (start != std::string::npos && line.compare(start, key.size() + 1, key + ":") == 0) {
+            const size_t value = line.find_first_not_of(' ', start + key.size() + 1);
+            return value == std::string::npos ? std::string() : line.substr(value);
+        }
+    }
+    return std::string();
+}
+
+// Command line shared by the benchmarks: --output <file> --iterations <n> --threads <n> --label key=value
+// and positional arguments
+struct Options {
+    std::string output;
+    int iterations;
+    int threads;
+    std::map<std::string, std::string> labels;
+    std::map<std::string, std::string> values;
+    std::vector<std::string> arguments;
+
+    Options() : iterations(20), threads(0) {}
+
+    std::string value(const std::string &key, const std::string &default_value) const {
+        auto found = values.find(key);
+        return found == values.end() ? default_value : found->second;
+    }
+};
+
+inline bool parse_options(int argc, const char **argv, Options &options) {
+    for (int i = 1; i < argc; ++i) {
+        const std::string argument = argv[i];
+        if (argument.compare(0, 2, "--") != 0) {
+            options.arguments.push_back(argument);
+            continue;
+        }
+        if (i + 1 >= argc) {
+            std::fprintf(stderr, "missing value for %s\n", argument.c_str());
+            return false;
+        }
+        const std::string value = argv[++i];
+        if (argument == "--output") {
+            options.output = value;
+        } else if (argument == "--iterations") {
+            options.iterations = std::max(1, std::atoi(value.c_str()));
+        } else if (argument == "--threads") {
+            options.threads = std::max(0, std::atoi(value.c_str()));
+        } else if (argument == "--label") {
+            const size_t separator = value.find('=');
+            if (separator == std::string::npos) {
+                std::fprintf(stderr, "--label expects key=value, got %s\n", value.c_str());
+                return false;
+            }
+            options.labels[value.substr(0, separator)] = value.substr(separator + 1);
+        } else {
+            options.values[argument.substr(2)] = value;
+        }
+    }
+    return true;
+}
+
+} // namespace benchmark
+
+#endif
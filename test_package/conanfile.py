@@ -3,13 +3,16 @@
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 
 from conans import ConanFile, CMake, tools
+from io import StringIO
+import json
 import os
+import re
 import shutil
 import sys
 
 class TestPackageConan(ConanFile):
     settings = "os", "compiler", "build_type", "arch"
-    generators = "cmake"
+    generators = "cmake", "cmake_find_package"
 
     def build(self):
         cmake = CMake(self)
@@ -20,13 +23,24 @@ class TestPackageConan(ConanFile):
         self.copy("*haarcascade_*.xml", os.path.join('bin', 'haarcascades'), keep_path=False)
         self.copy("*lbpcascade_*.xml", os.path.join('bin', 'lbpcascades'), keep_path=False)
 
+    def _executable(self, name):
+        return name + '.exe' if self.settings.os == 'Windows' else './' + name
+
     def test(self):
         if tools.cross_building(self.settings):
             return
         img_path = os.path.join(self.source_folder, "lena.jpg")
         shutil.copy(img_path, 'bin')
         with tools.chdir('bin'):
-            self.run('lena.exe' if self.settings.os == 'Windows' else './lena', run_environment=True)
+            if not os.path.isfile(self._executable('load-image')):
+                self.output.warn("opencv:modules doesn't include imgcodecs, skipping image tests")
+                return
+            if os.path.isfile(self._executable('lena')):
+                self.run(self._executable('lena'), run_environment=True)
+            if self.options["opencv"].instrumentation:
+                self._check_trace()
+            if self.options["opencv"].videoio_plugins and self.settings.os == "Linux":
+                self._check_videoio_plugins()
             test_images = []
             if self.options["opencv"].jpeg:
                 test_images.append('lena.jpg')
@@ -37,4 +51,271 @@ class TestPackageConan(ConanFile):
                 if self.options['libtiff'].jbig != False:
                     test_images.append('jbig.tiff')
             for image in test_images:
-                self.run(('load-image.exe' if self.settings.os == 'Windows' else './load-image') + ' ' + image, run_environment=True)
+                self.run(self._executable('load-image') + ' ' + image, run_environment=True)
+            if tools.get_env("CONAN_OPENCV_BENCHMARK", False):
+                self._benchmark_codecs()
+                self._benchmark_parallel()
+                self._benchmark_lapack()
+                self._benchmark_hal()
+                self._benchmark_dnn()
+                self._benchmark_gapi()
+                self._benchmark_video()
+                self._benchmark_jpeg2000()
+                if self.options["opencv"].perf_tests:
+                    self._benchmark_perf_tests()
+
+    def _benchmark_options(self, report):
+        options = ['--output', report,
+                   '--iterations', tools.get_env("CONAN_OPENCV_BENCHMARK_ITERATIONS", "20")]
+        if tools.get_env("CONAN_OPENCV_BENCHMARK_THREADS"):
+            options.extend(['--threads', tools.get_env("CONAN_OPENCV_BENCHMARK_THREADS")])
+        return options
+
+    def _benchmark_codecs(self):
+        opencv = self.options["opencv"]
+        codecs = []
+        labels = {}
+        if opencv.jpeg:
+            codecs.append("jpeg")
+            labels["jpeg"] = "libjpeg-turbo" if opencv.jpegturbo else "libjpeg"
+        if opencv.png:
+            codecs.append("png")
+        if opencv.webp:
+            codecs.append("webp")
+        if opencv.tiff:
+            codecs.append("tiff")
+            if self.options["libtiff"].lzma != False:
+                codecs.append("tiff-lzma")
+            if self.options["libtiff"].jbig != False:
+                codecs.append("tiff-jbig")
+        if opencv.jpeg2000:
+            codecs.append("jpeg2000")
+            labels["jpeg2000"] = str(opencv.jpeg2000)
+        if opencv.openexr:
+            codecs.append("exr")
+        command = [self._executable('benchmark-codecs'), '--images', '.']
+        command.extend(self._benchmark_options('benchmark-codecs.json'))
+        for key, value in sorted(labels.items()):
+            command.extend(['--label', '%s=%s' % (key, value)])
+        # OpenCV disables jasper at runtime unless it is explicitly allowed
+        with tools.environment_append({"OPENCV_IO_ENABLE_JASPER": "1"}):
+            self.run(" ".join(command + codecs), run_environment=True)
+        self.output.info("Codec benchmark report: %s" % os.path.abspath('benchmark-codecs.json'))
+
+    def _benchmark_parallel(self):
+        if not os.path.isfile(self._executable('benchmark-parallel')):
+            return
+        command = [self._executable('benchmark-parallel')] + self._benchmark_options('benchmark-parallel.json')
+        self.run(" ".join(command), run_environment=True)
+        self.output.info("Parallel benchmark report: %s" % os.path.abspath('benchmark-parallel.json'))
+
+    def _benchmark_lapack(self):
+        opencv = self.options["opencv"]
+        lapack = "openblas" if opencv.openblas else "lapack" if opencv.lapack else "none"
+        command = [self._executable('benchmark-lapack')] + self._benchmark_options('benchmark-lapack.json')
+        command.extend(['--label', 'lapack=%s' % lapack])
+        if lapack != "none":
+            command.extend(['--require-lapack', '1'])
+        self.run(" ".join(command), run_environment=True)
+        self.output.info("LAPACK benchmark report: %s" % os.path.abspath('benchmark-lapack.json'))
+
+    def _benchmark_hal(self):
+        if not os.path.isfile(self._executable('benchmark-hal')):
+            return
+        hal = self.options["opencv"].hal
+        command = [self._executable('benchmark-hal')] + self._benchmark_options('benchmark-hal.json')
+        command.extend(['--label', 'hal=%s' % hal])
+        if hal:
+            command.extend(['--require-hal', str(hal).split("/")[0]])
+        self.run(" ".join(command), run_environment=True)
+        self.output.info("HAL benchmark report: %s" % os.path.abspath('benchmark-hal.json'))
+        if str(hal).startswith("opencv_hal_reference/"):
+            # same binaries with the HAL functions disabled at runtime, the results must not change
+            disabled = [self._executable('benchmark-hal')] + self._benchmark_options('benchmark-hal-disabled.json')
+            disabled.extend(['--label', 'hal=%s' % hal, '--label', 'hal_disabled=1'])
+            with tools.environment_append({"OPENCV_HAL_REFERENCE": "0"}):
+                self.run(" ".join(disabled), run_environment=True)
+            with open('benchmark-hal.json') as enabled_report, open('benchmark-hal-disabled.json') as disabled_report:
+                enabled = json.load(enabled_report)["results"]
+                disabled = json.load(disabled_report)["results"]
+            for with_hal, without_hal in zip(enabled, disabled):
+                if with_hal["checksum"] != without_hal["checksum"]:
+                    raise Exception("%s %dx%d: the HAL result differs from OpenCV's" % (
+                        with_hal["kernel"], with_hal["width"], with_hal["height"]))
+                self.output.info("%-20s %5dx%-5d HAL %8.3f ms, OpenCV %8.3f ms" % (
+                    with_hal["kernel"], with_hal["width"], with_hal["height"],
+                    with_hal["latency_p50_ms"], without_hal["latency_p50_ms"]))
+
+    def _benchmark_dnn(self):
+        if not os.path.isfile(self._executable('benchmark-dnn')):
+            return
+        opencv = self.options["opencv"]
+        command = [self._executable('benchmark-dnn'), '--model', 'dnn-model.onnx']
+        command.extend(self._benchmark_options('benchmark-dnn.json'))
+        # the options of the package which change the inference code path
+        command.extend(['--label', 'cpu_baseline=%s' % self.deps_user_info["opencv"].cpu_baseline,
+                        '--label', 'cpu_dispatch=%s' % self.deps_user_info["opencv"].cpu_dispatch,
+                        '--label', 'eigen=%s' % opencv.eigen])
+        self.run(" ".join(command), run_environment=True)
+        self.output.info("DNN benchmark report: %s" % os.path.abspath('benchmark-dnn.json'))
+
+    def _benchmark_gapi(self):
+        if not os.path.isfile(self._executable('benchmark-gapi')):
+            return
+        # one process per mode and size: the peak RSS of a process is a high-water mark
+        modes = ["imgproc", "cpu", "fluid", "cpu-streaming", "fluid-streaming"]
+        results = []
+        for size in ["1920x1080", "3840x2160"]:
+            for mode in modes:
+                report = 'benchmark-gapi-%s-%s.json' % (mode, size)
+                command = [self._executable('benchmark-gapi'), '--mode', mode, '--size', size]
+                command.extend(self._benchmark_options(report))
+                self.run(" ".join(command), run_environment=True)
+                with open(report) as f:
+                    gapi_report = json.load(f)
+                os.remove(report)
+                results.extend(gapi_report["results"])
+        baselines = dict(((result["width"], result["height"]), result) for result in results
+                         if result["mode"] == "imgproc")
+        for result in results:
+            baseline = baselines[(result["width"], result["height"])]
+            result["speedup"] = result["frames_per_s"] / baseline["frames_per_s"] if baseline["frames_per_s"] else 0
+            result["rss_ratio"] = float(result["pipeline_rss_bytes"]) / baseline["pipeline_rss_bytes"] \
+                if baseline["pipeline_rss_bytes"] else 0
+            self.output.info("%-16s %5dx%-5d %8.1f frames/s (x%.2f)  peak %6.1f MB  max diff %g" % (
+                result["mode"], result["width"], result["height"], result["frames_per_s"], result["speedup"],
+                result["pipeline_rss_bytes"] / 1e6, result["max_abs_diff"]))
+        tools.save('benchmark-gapi.json', json.dumps({"benchmark": "gapi",
+                                                      "configuration": gapi_report["configuration"],
+                                                      "results": results}, indent=2))
+        self.output.info("G-API benchmark report: %s" % os.path.abspath('benchmark-gapi.json'))
+
+    def _benchmark_video(self):
+        if not os.path.isfile(self._executable('benchmark-video')):
+            return
+        opencv = self.options["opencv"]
+        # OpenCV's built-in MJPEG backend is the reference of the ffmpeg and gstreamer ones
+        backends = ["CV_MJPEG"]
+        if opencv.ffmpeg:
+            backends.append("FFMPEG")
+        if opencv.gstreamer:
+            backends.append("GSTREAMER")
+        for backend in backends:
+            report = 'benchmark-video-%s.json' % backend.lower()
+            command = [self._executable('benchmark-video'), '--backend', backend, '--image', 'lena.jpg']
+            command.extend(self._benchmark_options(report))
+            command.extend(['--label', 'videoio_plugins=%s' % opencv.videoio_plugins])
+            self.run(" ".join(command), run_environment=True)
+            self.output.info("Video benchmark report (%s): %s" % (backend, os.path.abspath(report)))
+
+    def _benchmark_jpeg2000(self):
+        opencv = self.options["opencv"]
+        if not opencv.jpeg2000 or not os.path.isfile(self._executable('benchmark-jpeg2000')):
+            return
+        report = 'benchmark-jpeg2000-%s.json' % opencv.jpeg2000
+        command = [self._executable('benchmark-jpeg2000'), '--image', 'archive.jp2']
+        command.extend(self._benchmark_options(report))
+        command.extend(['--label', 'jpeg2000=%s' % opencv.jpeg2000,
+                        '--label', 'openjpeg_threads=%s' % opencv.openjpeg_threads])
+        with tools.environment_append({"OPENCV_IO_ENABLE_JASPER": "1"}):
+            self.run(" ".join(command), run_environment=True)
+        self.output.info("JPEG 2000 benchmark report: %s" % os.path.abspath(report))
+        # a package has a single JPEG 2000 codec: the other one is the report of another build of the package
+        baseline_report = tools.get_env("CONAN_OPENCV_BENCHMARK_JPEG2000_BASELINE")
+        if not baseline_report:
+            return
+        with open(baseline_report) as f:
+            baseline = json.load(f)
+        with open(report) as f:
+            jpeg2000_report = json.load(f)
+        baseline_ms = min(result["decode_p50_ms"] for result in baseline["results"])
+        for result in jpeg2000_report["results"]:
+            result["speedup_vs_baseline"] = baseline_ms / result["decode_p50_ms"] if result["decode_p50_ms"] else 0
+            self.output.info("%s %2d threads %9.1f ms, x%.2f vs %s (%.1f ms)" % (
+                opencv.jpeg2000, result["threads"], result["decode_p50_ms"], result["speedup_vs_baseline"],
+                baseline["configuration"].get("jpeg2000"), baseline_ms))
+        jpeg2000_report["baseline"] = {"report": os.path.abspath(baseline_report),
+                                       "configuration": baseline["configuration"],
+                                       "decode_p50_ms": baseline_ms}
+        tools.save(report, json.dumps(jpeg2000_report, indent=2))
+
+    def _benchmark_perf_tests(self):
+        """runs OpenCV's own perf tests, packaged by opencv:perf_tests, for a few modules"""
+        command = [sys.executable, self.deps_user_info["opencv"].perf_tests_runner,
+                   '--output', 'opencv-perf',
+                   '--modules', tools.get_env("CONAN_OPENCV_PERF_TESTS_MODULES", "core,imgproc"),
+                   '--filter', '"%s"' % tools.get_env("CONAN_OPENCV_PERF_TESTS_FILTER", "*")]
+        if tools.get_env("CONAN_OPENCV_BENCHMARK_THREADS"):
+            command.extend(['--threads', tools.get_env("CONAN_OPENCV_BENCHMARK_THREADS")])
+        self.run(" ".join(command), run_environment=True)
+        self.output.info("Perf tests digest: %s" % os.path.abspath(os.path.join('opencv-perf', 'perf-digest.json')))
+
+    def _check_videoio_plugins(self):
+        """opencv::opencv doesn't link the requirements of the videoio plugins, only the plugins load them"""
+        if not os.path.isfile(self._executable('load-image-opencv')):
+            return
+        output = StringIO()
+        self.run("ldd %s" % self._executable('load-image-opencv'), output=output, run_environment=True)
+        linked = re.findall(r"^\s*(lib(?:av|sw|gst)\S*)", output.getvalue(), re.MULTILINE)
+        if linked:
+            raise Exception("opencv::opencv links the requirements of the videoio plugins: %s" % ", ".join(linked))
+
+    def _check_trace(self):
+        """runs the test programs with OpenCV's trace enabled and summarizes the trace regions"""
+        tools.rmdir('opencv-trace')
+        os.makedirs('opencv-trace')
+        location = os.path.join('opencv-trace', 'OpenCVTrace')
+        if os.path.isfile(self._executable('lena')):
+            command = self._executable('lena')
+            expected = ["cv::imread", "cv::cvtColor", "cv::equalizeHist", "cv::CascadeClassifier::detectMultiScale"]
+        else:
+            command = self._executable('load-image') + ' lena.jpg'
+            expected = ["cv::imread"]
+        with tools.environment_append({"OPENCV_TRACE": "1", "OPENCV_TRACE_LOCATION": location}):
+            self.run(command, run_environment=True)
+
+        # master file: "l,<location id>,<file>,<line>,<name>,<flags>" and "#thread file: <name>" lines, thread
+        # files: "e,<thread>,<timestamp>,<location id>,<region id>,<duration ns>" on region exit
+        master = location + '.txt'
+        if not os.path.isfile(master):
+            raise Exception("OPENCV_TRACE=1 didn't produce %s" % master)
+        lines = tools.load(master).splitlines()
+        if not lines or lines[0] != "#description: OpenCV trace file":
+            raise Exception("%s is not an OpenCV trace file" % master)
+        names = {}
+        thread_files = []
+        for line in lines:
+            if line.startswith("l,"):
+                fields = line.split(",", 2)
+                names[fields[1]] = fields[2].rsplit('",', 1)[0].rsplit(',"', 1)[-1]
+            elif line.startswith("#thread file: "):
+                thread_files.append(line[len("#thread file: "):])
+        regions = {}
+        for thread_file in thread_files:
+            for line in tools.load(os.path.join('opencv-trace', thread_file)).splitlines():
+                if not line.startswith("e,"):
+                    continue
+                fields = line.split(",")
+                name = names.get(fields[3], fields[3])
+                regions.setdefault(name, []).append(int(fields[5]) / 1e6)
+        # gcc and clang name the regions after the function signature, msvc after the qualified name
+        missing = [function for function in expected
+                   if not any(name == function or function + "(" in name for name in regions)]
+        if missing:
+            raise Exception("OpenCV trace has no region for %s" % ", ".join(missing))
+
+        summary = []
+        for name, durations in regions.items():
+            durations.sort()
+            summary.append({"region": name,
+                            "calls": len(durations),
+                            "total_ms": sum(durations),
+                            "p50_ms": durations[(len(durations) - 1) // 2],
+                            "p99_ms": durations[min(len(durations) - 1, (len(durations) * 99 + 99) // 100 - 1)],
+                            "max_ms": durations[-1]})
+        summary.sort(key=lambda region: region["total_ms"], reverse=True)
+        tools.save('trace-summary.json', json.dumps({"trace": os.path.abspath(master), "regions": summary}, indent=2))
+        for region in summary[:10]:
+            self.output.info("%10.3f ms %6d calls  p99 %8.3f ms  %s" % (region["total_ms"], region["calls"],
+                                                                   region["p99_ms"], region["region"]))
+        self.output.info("OpenCV trace summary: %s" % os.path.abspath('trace-summary.json'))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Generates dnn-model.onnx, the model of benchmark-dnn: a small image classifier (6 convolutions, global average
+pooling and a fully connected layer, 1x3x224x224 input, 100 classes) with random weights. Only the inference cost
+matters, so the weights are generated from a fixed seed instead of being trained.
+
+requires: pip install onnx numpy
+"""
+
+import os
+
+import numpy
+import onnx
+from onnx import helper, numpy_helper, TensorProto
+
+# (output channels, stride) of the 3x3 convolutions
+CONVOLUTIONS = [(16, 2), (32, 2), (64, 2), (64, 1), (128, 2), (128, 1)]
+CLASSES = 100
+INPUT_SIZE = 224
+
+
+def main():
+    random = numpy.random.RandomState(20200601)
+    nodes = []
+    initializers = []
+
+    def weights(name, shape, fan_in):
+        initializers.append(numpy_helper.from_array(
+            (random.standard_normal(shape) * numpy.sqrt(2.0 / fan_in)).astype(numpy.float32), name))
+        return name
+
+    layer_input, channels = "input", 3
+    for index, (output_channels, stride) in enumerate(CONVOLUTIONS):
+        name = "conv%d" % (index + 1)
+        nodes.append(helper.make_node(
+            "Conv", [layer_input, weights(name + ".weight", (output_channels, channels, 3, 3), channels * 9),
+                     weights(name + ".bias", (output_channels,), channels * 9)],
+            [name], kernel_shape=[3, 3], strides=[stride, stride], pads=[1, 1, 1, 1]))
+        nodes.append(helper.make_node("Relu", [name], [name + ".relu"]))
+        layer_input, channels = name + ".relu", output_channels
+    nodes.append(helper.make_node("GlobalAveragePool", [layer_input], ["pool"]))
+    nodes.append(helper.make_node("Flatten", ["pool"], ["flatten"], axis=1))
+    nodes.append(helper.make_node("Gemm", ["flatten", weights("fc.weight", (CLASSES, channels), channels),
+                                           weights("fc.bias", (CLASSES,), channels)], ["fc"], transB=1))
+    nodes.append(helper.make_node("Softmax", ["fc"], ["output"], axis=1))
+
+    graph = helper.make_graph(
+        nodes, "benchmark-dnn",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [1, 3, INPUT_SIZE, INPUT_SIZE])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [1, CLASSES])],
+        initializers)
+    # opset 11 and IR version 6 (onnx 1.7): the versions OpenCV 4.3's ONNX importer knows
+    model = helper.make_model(graph, producer_name="conan-opencv", ir_version=6,
+                              opset_imports=[helper.make_opsetid("", 11)])
+    onnx.checker.check_model(model)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dnn-model.onnx")
+    onnx.save(model, path)
+    print("%s: %d parameters" % (path, sum(numpy_helper.to_array(tensor).size for tensor in initializers)))
+
+
+if __name__ == "__main__":
+    main()
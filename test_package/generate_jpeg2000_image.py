@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Generates archive.jp2, the image of benchmark-jpeg2000: lena.jpg upscaled to 4096x4096 with a fixed seed sensor
+noise, encoded as a lossy (9/7 wavelet, 1:40) JP2 of 16 1024x1024 tiles, the layout of large scanned or aerial
+archival images. OpenCV's encoders only write single tile images.
+
+requires: pip install pillow numpy (Pillow built with OpenJPEG)
+"""
+
+import os
+
+import numpy
+from PIL import Image
+
+SIZE = 4096
+TILE = 1024
+RATE = 40
+
+
+def main():
+    folder = os.path.dirname(os.path.abspath(__file__))
+    image = Image.open(os.path.join(folder, "lena.jpg")).convert("RGB").resize((SIZE, SIZE), Image.BICUBIC)
+    random = numpy.random.RandomState(20200601)
+    pixels = numpy.asarray(image, dtype=numpy.float32) + random.normal(0, 3, (SIZE, SIZE, 3))
+    image = Image.fromarray(numpy.clip(pixels, 0, 255).astype(numpy.uint8))
+    image.save(os.path.join(folder, "archive.jp2"), tile_size=(TILE, TILE), quality_mode="rates",
+               quality_layers=[RATE], irreversible=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 #include "opencv2/objdetect/objdetect.hpp"
-#include "opencv2/highgui/highgui.hpp"
+#include "opencv2/imgcodecs/imgcodecs.hpp"
 #include "opencv2/imgproc/imgproc.hpp"
 
 #include <iostream>
@@ -21,8 +21,6 @@ RNG rng(12345);
 
 /** @function main */
 int main( int argc, const char** argv ){
-    CvCapture* capture;
-
     //-- 1. Load the cascades
     if( !face_cascade.load( face_cascade_name ) ){ printf("--(!)Error loading face cascades\n"); return -1; };
     if( !eyes_cascade.load( eyes_cascade_name ) ){ printf("--(!)Error loading eyes cascades\n"); return -1; };